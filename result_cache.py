@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+🗃️ RESULT CACHE - Persistent cache of checker results by content hash
+✅ Keyed by (content hash, checker name, rule/agent version)
+✅ A rule or code change gives a new version, so stale results are never served
+✅ LRU eviction with an entry cap, amortized over a slack margin
+✅ Hits only write when their recency stamp is stale, so reads don't queue on the write lock
+✅ Shared SQLite store (WAL), safe across threads and processes
+"""
+
+import json
+import time
+import inspect
+import hashlib
+import functools
+import threading
+from typing import Dict, Optional
+
+from sqlite_store import get_store
+
+DEFAULT_CACHE_PATH = "cache/results.db"
+
+def content_hash(content: str, *extra) -> str:
+    """Digest of the content plus every other input that shapes the result"""
+    digest = hashlib.sha256(content.encode('utf-8', errors='replace'))
+    for item in extra:
+        digest.update(b'\0')
+        digest.update(json.dumps(item, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def code_version(*objects) -> str:
+    """Digest of the source of the given classes/functions, so editing them invalidates
+
+    Memoized: finding a class's source parses its whole module, and the source
+    cannot change while the process runs.
+    """
+    digest = hashlib.sha1()
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode('utf-8'))
+        except (OSError, TypeError):
+            # No source available (frozen app, REPL): fall back to the name
+            digest.update(getattr(obj, '__qualname__', repr(obj)).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+class ResultCache:
+    """LRU cache of JSON results persisted in SQLite"""
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, max_entries: int = 20000,
+                 touch_interval: float = 300.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        # LRU order only needs to be this precise (seconds); fresher hits are read-only
+        self.touch_interval = touch_interval
+        # Evict down to 90% of the cap at once rather than one row per insert
+        self.slack = max(1, max_entries // 10)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._versions = {}  # checker -> version already purged of older entries
+        self._lock = threading.Lock()
+
+        self.store = get_store(db_path)
+        self._init_database()
+        self._size = self._count()
+
+    def _init_database(self):
+        with self.store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    content_hash TEXT,
+                    checker TEXT,
+                    version TEXT,
+                    result TEXT,
+                    created_at REAL,
+                    last_used REAL,
+                    PRIMARY KEY (content_hash, checker, version)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_lru ON result_cache (last_used)")
+
+    def _count(self) -> int:
+        return self.store.connection().execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+
+    def get(self, checker: str, version: str, key: str) -> Optional[Dict]:
+        """Cached result, or None; a hit refreshes last_used once it is touch_interval old"""
+        self._purge_old_versions(checker, version)
+        row = self.store.connection().execute(
+            "SELECT result, last_used FROM result_cache WHERE content_hash = ? AND checker = ? AND version = ?",
+            (key, checker, version)
+        ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        now = time.time()
+        if now - row[1] >= self.touch_interval:
+            with self.store.transaction() as conn:
+                conn.execute(
+                    "UPDATE result_cache SET last_used = ? WHERE content_hash = ? AND checker = ? AND version = ?",
+                    (now, key, checker, version)
+                )
+        return json.loads(row[0])
+
+    def put(self, checker: str, version: str, key: str, result: Dict):
+        now = time.time()
+        with self.store.transaction() as conn:
+            inserted = conn.execute(
+                '''INSERT INTO result_cache (content_hash, checker, version, result, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(content_hash, checker, version) DO UPDATE SET
+                       result = excluded.result, last_used = excluded.last_used''',
+                (key, checker, version, json.dumps(result, default=str), now, now)
+            ).rowcount
+
+            with self._lock:
+                self._size += inserted
+                over_cap = self._size > self.max_entries
+            if over_cap:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop least recently used rows down to max_entries - slack"""
+        # Other processes write to the same file, so recount before trusting the estimate
+        size = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        excess = size - (self.max_entries - self.slack)
+        if excess > 0:
+            # Range delete on the last_used index up to the excess-th oldest timestamp
+            excess = conn.execute('''
+                DELETE FROM result_cache WHERE last_used <= (
+                    SELECT last_used FROM result_cache ORDER BY last_used LIMIT 1 OFFSET ?
+                )
+            ''', (excess - 1,)).rowcount
+            size -= excess
+        with self._lock:
+            self.evictions += max(excess, 0)
+            self._size = size
+
+    def _purge_old_versions(self, checker: str, version: str):
+        """Results of superseded rules/agents can never hit again, so free their space"""
+        if self._versions.get(checker) == version:
+            return
+        with self.store.transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM result_cache WHERE checker = ? AND version != ?", (checker, version)
+            ).rowcount
+        with self._lock:
+            self._versions[checker] = version
+            self._size = max(self._size - removed, 0)
+
+    def invalidate(self, checker: str = None):
+        """Forget every result (of one checker, or all of them)"""
+        with self.store.transaction() as conn:
+            if checker:
+                conn.execute("DELETE FROM result_cache WHERE checker = ?", (checker,))
+            else:
+                conn.execute("DELETE FROM result_cache")
+            size = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        with self._lock:
+            self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': self._size,
+                'maxsize': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+            }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+🗄️ SQLITE STORE - Shared long-lived connections for every add-on database
+✅ One connection per thread per database file, reused across calls
+✅ WAL, synchronous=NORMAL, busy_timeout, mmap and cache pragmas applied once
+✅ transaction() context manager (nested blocks join the outer transaction)
+✅ Connections of finished threads are reaped, everything is closed at exit
+✅ Forked children open fresh connections instead of reusing inherited ones
+"""
+
+import os
+import atexit
+import sqlite3
+import weakref
+import threading
+import contextlib
+from typing import Dict
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 30000,          # ms
+    'mmap_size': 64 * 1024 * 1024,  # bytes
+    'cache_size': -16000,           # negative = KiB (~16 MB)
+    'temp_store': 'MEMORY'
+}
+
+class SQLiteStore:
+    """Thread-local long-lived connections to one database file"""
+
+    def __init__(self, db_path: str, pragmas: Dict = None, timeout: float = 30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+
+        self._local = threading.local()
+        self._connections = {}  # thread -> connection
+        self._lock = threading.Lock()
+        _all_stores.add(self)
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened and configured on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._reap_finished_threads()
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        # Each connection is only used by its own thread; check_same_thread is off so
+        # close_all() and the reaper can close it from elsewhere
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        # auto_vacuum only takes effect on a new file if it precedes journal_mode=WAL
+        for name in sorted(self.pragmas, key=lambda name: name != 'auto_vacuum'):
+            conn.execute(f"PRAGMA {name} = {self.pragmas[name]}").fetchall()
+        return conn
+
+    def _reap_finished_threads(self):
+        for thread in [t for t in self._connections if not t.is_alive()]:
+            self._connections.pop(thread).close()
+
+    @contextlib.contextmanager
+    def transaction(self, immediate: bool = True):
+        """Commit on success, roll back on error; nested blocks join the outer one
+
+        immediate=True takes the write lock up front (BEGIN IMMEDIATE) so a
+        read-then-write transaction waits on busy_timeout instead of failing
+        with 'database is locked' when another writer got there first.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        if conn.in_transaction:
+            # Finish whatever implicit transaction a plain execute() left open
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.depth = 0
+
+    def close(self):
+        """Close every thread's connection to this database"""
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+_stores = {}
+_stores_lock = threading.Lock()
+_all_stores = weakref.WeakSet()  # every store, registered or not, for the fork hook
+_inherited_connections = []
+
+def get_store(db_path: str, pragmas: Dict = None) -> SQLiteStore:
+    """Shared store for a database path (one per absolute path per process)"""
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SQLiteStore(db_path, pragmas)
+        return store
+
+def _forget_inherited_stores():
+    """fork() copies open connections into the child, where they must not be used or closed
+    
+    Stores created before the fork stay usable (and registered): each one drops
+    the inherited connections without closing them and opens fresh ones on
+    next use.
+    """
+    global _stores_lock
+    for store in list(_all_stores):
+        # Kept referenced so garbage collection never closes (and checkpoints) them here
+        _inherited_connections.extend(store._connections.values())
+        store._local = threading.local()
+        store._connections = {}
+        store._lock = threading.Lock()
+    _stores_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_inherited_stores)
+
+@atexit.register
+def close_all_stores():
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+⏱️ STAGE PROFILER - Opt-in cProfile + tracemalloc per pipeline stage
+✅ Enable with PROFILE_STAGES=1 or the --profile-stages flag
+✅ Per-stage .pstats files and top allocation sites
+✅ Summary table of profiled time by stage, written once at exit
+✅ Zero cost when disabled (a shared no-op context manager)
+"""
+
+import os
+import sys
+import time
+import cProfile
+import pstats
+import tracemalloc
+import atexit
+import threading
+import contextlib
+from datetime import datetime
+from typing import Dict, List
+
+PROFILE_ENV_VAR = "PROFILE_STAGES"
+PROFILE_FLAG = "--profile-stages"
+
+_NULL_STAGE = contextlib.nullcontext()
+
+# cProfile can only have one active profiler per process (3.12+ refuses a second,
+# older versions corrupt the first), so this guard is shared by every instance
+_ACTIVE = threading.Lock()
+
+def profiling_enabled() -> bool:
+    """True when profiling was requested via env var or CLI flag"""
+    return (
+        os.getenv(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+        or PROFILE_FLAG in sys.argv
+    )
+
+class StageProfiler:
+    """Wrap pipeline stages with cProfile and tracemalloc"""
+    
+    def __init__(self, output_dir: str = "telemetry/profiles", enabled: bool = None,
+                 top_allocations: int = 15):
+        self.enabled = profiling_enabled() if enabled is None else enabled
+        self.top_allocations = top_allocations
+        self.stats = {}
+        self.run_dir = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+        
+        if self.enabled:
+            # Absolute, since the summary is written at exit from whatever the cwd is then
+            self.run_dir = os.path.abspath(os.path.join(output_dir, datetime.now().strftime('%Y%m%d_%H%M%S')))
+            os.makedirs(self.run_dir, exist_ok=True)
+            atexit.register(self.write_summary)
+    
+    def stage(self, name: str):
+        """Context manager for one stage; a no-op when profiling is disabled"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._profile_stage(name)
+    
+    @contextlib.contextmanager
+    def _profile_stage(self, name: str):
+        started = self._start_profile() if _ACTIVE.acquire(blocking=False) else None
+        if started is None:
+            # Already inside a profiled stage (of any instance, or another thread is): time it only
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self._record(name, (time.perf_counter() - start) * 1000, 0.0, None, 0)
+            return
+        
+        profile, started_tracing, before = started
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall_ms = (time.perf_counter() - start) * 1000
+            
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            _ACTIVE.release()
+            
+            self._write_stage(name, wall_ms, profile, before, after)
+    
+    def _start_profile(self):
+        """(profile, started_tracing, snapshot) with _ACTIVE held, or None with it released"""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Some other profiling tool (not a StageProfiler) is already running
+            if started_tracing:
+                tracemalloc.stop()
+            _ACTIVE.release()
+            return None
+        return profile, started_tracing, before
+    
+    def _write_stage(self, name: str, wall_ms: float, profile: cProfile.Profile,
+                     before: tracemalloc.Snapshot, after: tracemalloc.Snapshot):
+        """Dump pstats and top allocation sites for one stage run"""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        safe_name = ''.join(c if c.isalnum() or c in '._-' else '_' for c in name)
+        prefix = os.path.join(self.run_dir, f"{sequence:03d}_{safe_name}")
+        
+        profile.dump_stats(f"{prefix}.pstats")
+        
+        stats = pstats.Stats(profile)
+        # Sum of every function's own time: all time cProfile saw, minus its overhead
+        profiled_ms = sum(entry[2] for entry in stats.stats.values()) * 1000
+        top_function = None
+        if stats.stats:
+            (filename, line, function), entry = max(stats.stats.items(), key=lambda item: item[1][2])
+            top_function = f"{os.path.basename(filename)}:{line}({function}) {entry[2] * 1000:.1f}ms"
+        
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        net_bytes = sum(stat.size_diff for stat in diff)
+        
+        with open(f"{prefix}_allocations.txt", 'w') as f:
+            f.write(f"Stage: {name}\n")
+            f.write(f"Net allocated: {net_bytes / 1024:.1f} KiB\n\n")
+            for stat in diff[:self.top_allocations]:
+                f.write(f"{stat}\n")
+        
+        self._record(name, wall_ms, profiled_ms, top_function, net_bytes)
+    
+    def _record(self, name: str, wall_ms: float, profiled_ms: float, top_function: str, net_bytes: int):
+        with self._lock:
+            entry = self.stats.setdefault(name, {
+                'calls': 0, 'wall_ms': 0.0, 'profiled_ms': 0.0, 'net_bytes': 0, 'top_function': None
+            })
+            entry['calls'] += 1
+            entry['wall_ms'] += wall_ms
+            entry['profiled_ms'] += profiled_ms
+            entry['net_bytes'] += net_bytes
+            if top_function:
+                entry['top_function'] = top_function
+    
+    def summary_rows(self) -> List[Dict]:
+        """Per-stage totals, most expensive first"""
+        with self._lock:
+            rows = [{'stage': name, **entry} for name, entry in self.stats.items()]
+        return sorted(rows, key=lambda row: row['profiled_ms'], reverse=True)
+    
+    def summary_table(self) -> str:
+        lines = [
+            f"{'Stage':<32} {'Calls':>5} {'Wall ms':>10} {'Prof. ms':>10} {'Net KiB':>9}  Top self-time function",
+            "-" * 120
+        ]
+        for row in self.summary_rows():
+            lines.append(
+                f"{row['stage'][:32]:<32} {row['calls']:>5} {row['wall_ms']:>10.1f} {row['profiled_ms']:>10.1f} "
+                f"{row['net_bytes'] / 1024:>9.1f}  {row['top_function'] or '-'}"
+            )
+        return "\n".join(lines)
+    
+    def report(self) -> str:
+        """Print the summary table so far (summary.txt is written at exit)"""
+        if not self.enabled or not self.stats:
+            return None
+        
+        table = self.summary_table()
+        print(f"\n⏱️  Stage profile ({self.run_dir}):")
+        print(table)
+        return table
+    
+    def write_summary(self) -> str:
+        """Write the summary table next to the stage dumps"""
+        if not self.enabled or not self.stats:
+            return None
+        
+        summary_file = os.path.join(self.run_dir, "summary.txt")
+        with open(summary_file, 'w') as f:
+            f.write(self.summary_table() + "\n")
+        return summary_file
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+
+import pytest
+
+from ultimate_maker_v7 import ContentMemory, MemoryBackfill
+
+def _old_database(rows):
+    """A content memory file from before the unique topic index, with duplicate rows"""
+    os.makedirs('memory', exist_ok=True)
+    conn = sqlite3.connect('memory/content_memory.db')
+    conn.execute('''
+        CREATE TABLE topic_performance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic_pattern TEXT,
+            total_articles INTEGER DEFAULT 0,
+            avg_word_count REAL DEFAULT 0,
+            avg_performance REAL DEFAULT 0,
+            avg_revenue REAL DEFAULT 0,
+            success_rate REAL DEFAULT 0,
+            last_used TEXT
+        )
+    ''')
+    conn.executemany(
+        "INSERT INTO topic_performance (topic_pattern, total_articles, avg_word_count, avg_performance, "
+        "avg_revenue, success_rate, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.close()
+
+def test_duplicate_topics_keep_weighted_averages(workdir):
+    _old_database([
+        ('best vpn', 1, 1000, 40, 10, 0.5, '2026-01-01'),
+        ('best vpn', 3, 2000, 80, 30, 1.0, '2026-02-01'),
+        ('home gym', 0, 1500, 60, 0, 0, '2026-01-15'),
+        ('home gym', 0, 2500, 20, 0, 0, '2026-01-10'),
+    ])
+    memory = ContentMemory()
+    
+    rows = memory.store.connection().execute(
+        "SELECT topic_pattern, total_articles, avg_word_count, avg_performance, avg_revenue, success_rate, last_used "
+        "FROM topic_performance ORDER BY topic_pattern"
+    ).fetchall()
+    assert rows == [
+        ('best vpn', 4, 1750.0, 70.0, 25.0, pytest.approx(0.875), '2026-02-01'),
+        ('home gym', 0, 2000.0, 40.0, 0.0, 0.0, '2026-01-15'),
+    ]
+
+def _write(path, title, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(f"<html><title>{title}</title><body>{body}</body></html>")
+
+def test_backfill_inserts_each_article_once(workdir):
+    _write('output/best-vpn.html', 'Best VPN', 'private browsing for everyone')
+    _write('output/home-gym.html', 'Home Gym', 'weights at home')
+    # Same content under another name, and another content under a taken slug
+    _write('output/best-vpn-copy.html', 'Best VPN', 'private browsing for everyone')
+    _write('backups/article_2.html', 'Home Gym', 'a different body')
+    # .txt backups take their title from an 'ARTICLE:' line, so this is 'Unknown Title'
+    _write('backups/article_1.txt', 'Gym', 'no article header')
+    
+    memory = ContentMemory()
+    first = MemoryBackfill(memory, workers=2, batch_size=2).run('output', 'backups', 'missing.json')
+    assert first['imported'] == 3
+    assert first['duplicates'] == 2
+    
+    second = MemoryBackfill(memory, workers=2).run('output', 'backups', 'missing.json')
+    assert second['imported'] == 0
+    assert second['skipped_sources'] == second['scanned']
+    
+    conn = memory.store.connection()
+    slugs = [row[0] for row in conn.execute("SELECT slug FROM articles ORDER BY slug")]
+    assert slugs == ['best-vpn', 'home-gym', 'unknown-title']
+    assert memory.check_stats()['consistent']
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from ultimate_maker_v7 import PhraseMatcher, SafetyGuardrail
+
+# Filler that contains no lexicon phrase as a substring, so word boundaries and
+# plain substring counting agree
+FILLER = ['the', 'cat', 'sat', 'on', 'a', 'mat', 'while', 'we', 'ran', 'home', 'today', 'quietly']
+SEPARATORS = [' ', ', ', '. ', '! ', ' (', ') ', '\n', ' - ']
+
+@pytest.fixture
+def phrases(workdir):
+    return SafetyGuardrail().ruleset.matcher.phrases
+
+def _substring_counts(text, phrases):
+    """What the checks counted before the automaton: str.count on the lowercased text"""
+    lowered = text.lower()
+    return {phrase: lowered.count(phrase) for phrase in phrases if phrase in lowered}
+
+@pytest.mark.parametrize('seed', range(20))
+def test_scan_matches_substring_counts(phrases, seed):
+    rng = random.Random(seed)
+    pieces = []
+    for _ in range(300):
+        word = rng.choice(phrases) if rng.random() < 0.2 else rng.choice(FILLER)
+        pieces.append(word.upper() if rng.random() < 0.1 else word)
+        pieces.append(rng.choice(SEPARATORS))
+    text = ''.join(pieces)
+    
+    assert PhraseMatcher(phrases).scan(text) == _substring_counts(text, phrases)
+
+def test_scan_only_matches_whole_words():
+    matcher = PhraseMatcher(['best', 'get rich quick'])
+    assert matcher.scan("A bestseller on how to get rich quickly") == {}
+    assert matcher.scan("The best way to GET RICH QUICK, best of all") == {'best': 2, 'get rich quick': 1}
@@ -0,0 +1,32 @@
+import os
+
+from ultimate_maker_v7 import PlagiarismSignal, SafetyGuardrail
+
+ARTICLE = " ".join(f"word{i % 97} topic{i % 13} money{i % 7}" for i in range(300))
+
+def test_indexed_article_is_not_a_copy_of_itself(workdir):
+    guardrail = SafetyGuardrail()
+    guardrail.remember_content('memory:1', ARTICLE)
+    
+    own = guardrail.check_content(ARTICLE + ' extra', doc_id='memory:1')['checks']['plagiarism']
+    assert own['passed']
+    assert all(neighbor['doc_id'] != 'memory:1' for neighbor in own['nearest_neighbors'])
+    
+    # Without its own id the same text is still a near-duplicate of the indexed copy
+    other = guardrail.check_content(ARTICLE + ' more')['checks']['plagiarism']
+    assert not other['passed']
+    assert other['nearest_neighbors'][0]['doc_id'] == 'memory:1'
+
+def test_short_texts_never_match(workdir):
+    signal = PlagiarismSignal('safety/near_duplicates.db')
+    signal.add_many([('empty', '', None), ('short', 'too short', None)])
+    
+    assert signal.signature('') is None
+    assert signal.count() == 0
+    assert signal.query('') == []
+    assert signal.query('too short') == []
+
+def test_missing_articles_pro_database_is_not_created(workdir):
+    signal = PlagiarismSignal('safety/near_duplicates.db')
+    assert signal.index_articles_pro('data/missing.db') == 0
+    assert not os.path.exists('data/missing.db')
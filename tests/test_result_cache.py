@@ -0,0 +1,66 @@
+import time
+
+from result_cache import ResultCache
+from ultimate_maker_v7 import SafetyGuardrail
+
+ARTICLE = " ".join(f"cached{i % 83} words{i % 17} here{i % 5}" for i in range(250))
+
+def test_lru_eviction_respects_cap(workdir):
+    cache = ResultCache('cache/results.db', max_entries=20)
+    for i in range(50):
+        cache.put('checker', 'v1', f"key{i}", {'i': i})
+    
+    assert len(cache) <= 20
+    assert cache.get('checker', 'v1', 'key49') == {'i': 49}
+    assert cache.get('checker', 'v1', 'key0') is None
+
+def test_new_version_never_serves_old_results(workdir):
+    cache = ResultCache('cache/results.db')
+    cache.put('checker', 'v1', 'key', {'old': True})
+    
+    assert cache.get('checker', 'v2', 'key') is None
+    assert cache.get('checker', 'v1', 'key') is None  # purged once v2 was seen
+
+def test_recent_hits_do_not_write(workdir):
+    cache = ResultCache('cache/results.db', touch_interval=300)
+    cache.put('checker', 'v1', 'key', {'x': 1})
+    conn = cache.store.connection()
+    before = conn.total_changes
+    
+    for _ in range(10):
+        assert cache.get('checker', 'v1', 'key') == {'x': 1}
+    assert conn.total_changes == before
+
+def test_stale_hit_refreshes_last_used(workdir):
+    cache = ResultCache('cache/results.db', touch_interval=0)
+    cache.put('checker', 'v1', 'key', {'x': 1})
+    conn = cache.store.connection()
+    conn.execute("UPDATE result_cache SET last_used = 0")
+    conn.commit()
+    
+    cache.get('checker', 'v1', 'key')
+    assert conn.execute("SELECT last_used FROM result_cache").fetchone()[0] > time.time() - 60
+
+def test_plagiarism_is_rechecked_on_cache_hits(workdir):
+    guardrail = SafetyGuardrail()
+    first = guardrail.check_content(ARTICLE, 'Title')
+    assert first['checks']['plagiarism']['passed']
+    
+    # A near-duplicate indexed after the first check must show up on the next one
+    guardrail.remember_content('memory:other', ARTICLE + ' copy')
+    second = guardrail.check_content(ARTICLE, 'Title')
+    assert guardrail.result_cache.hits >= 1
+    assert not second['checks']['plagiarism']['passed']
+    assert second['checks']['exaggerated_claims'] == first['checks']['exaggerated_claims']
+
+def test_checking_code_change_invalidates_safety_results(workdir):
+    guardrail = SafetyGuardrail(ResultCache('cache/results.db'))
+    guardrail.check_content(ARTICLE)
+    guardrail.check_content(ARTICLE)
+    assert guardrail.result_cache.hits == 1
+    
+    # What a deploy with edited check code looks like to the cache
+    guardrail.code_version = 'edited'
+    guardrail.check_content(ARTICLE)
+    assert guardrail.result_cache.hits == 1
+    assert guardrail.result_cache.misses == 2
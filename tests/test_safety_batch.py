@@ -0,0 +1,26 @@
+import pytest
+
+from ultimate_maker_v7 import SafetyGuardrail
+
+def article(i):
+    return " ".join(f"article{i} word{j % 89} topic{j % 11}" for j in range(200))
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_batch_keeps_order_and_excludes_own_index_entry(workdir, workers):
+    guardrail = SafetyGuardrail()
+    for i in range(5):
+        guardrail.remember_content(f"memory:a{i}", article(i))
+    
+    items = [{'id': f"a{i}.md", 'doc_id': f"memory:a{i}", 'content': article(i)} for i in range(5)]
+    results = list(guardrail.iter_check_batch(items, workers=workers, chunk_size=2))
+    
+    assert [result['article_id'] for result in results] == [f"a{i}.md" for i in range(5)]
+    assert all(result['checks']['plagiarism']['passed'] for result in results)
+
+def test_check_batch_aggregates_without_report_files(workdir):
+    guardrail = SafetyGuardrail()
+    stats = guardrail.check_batch((article(i) for i in range(6)), workers=1, write_report=False)
+    
+    assert stats['total_checks'] == 6
+    assert sum(stats['risk_levels'].values()) == 6
+    assert not list(workdir.joinpath('safety').glob('safety_report_*.json'))
@@ -0,0 +1,35 @@
+import json
+import os
+
+from ultimate_maker_v7 import SafetyGuardrail
+
+CONTENT = " ".join(["Our plan delivers lightning fast setup for every reader."] * 20)
+
+def _write_rules(path, rules, mtime_ns):
+    with open(path, 'w') as f:
+        f.write(rules if isinstance(rules, str) else json.dumps(rules))
+    # Edits within one mtime tick must still look like a change
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def _blacklisted(guardrail):
+    return guardrail.check_content(CONTENT)['checks']['exaggerated_claims']['found_blacklisted_phrases']
+
+def test_rules_file_edits_swap_the_rule_set(workdir):
+    guardrail = SafetyGuardrail()
+    default = guardrail.current_rules()
+    assert _blacklisted(guardrail) == []
+    
+    _write_rules(guardrail.rules_file, {'exaggerated_claims': {'blacklisted_phrases': ['lightning fast']}}, 10**18)
+    edited = guardrail.current_rules()
+    assert edited.version != default.version
+    # The cached result belongs to the old version, so the new phrase is found
+    assert _blacklisted(guardrail) == ['lightning fast']
+    
+    # A half-saved file keeps the last good rules
+    _write_rules(guardrail.rules_file, '{"exaggerated_claims": ', 2 * 10**18)
+    assert guardrail.current_rules() is edited
+    
+    # Deleting the file goes back to the defaults
+    os.remove(guardrail.rules_file)
+    assert guardrail.current_rules().version == default.version
+    assert _blacklisted(guardrail) == []
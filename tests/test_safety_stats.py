@@ -0,0 +1,45 @@
+import json
+
+from ultimate_maker_v7 import SafetyGuardrail
+
+def test_stats_without_checks(workdir):
+    assert SafetyGuardrail().get_safety_stats() == {'total_checks': 0, 'avg_safety_score': 1.0}
+
+def test_buffered_checks_are_counted_and_flushed_in_one_write(workdir):
+    guardrail = SafetyGuardrail()
+    conn = guardrail.stats_store.connection()
+    for i in range(3):
+        guardrail.check_content(f"Article {i} text. " * 20, f"Title {i}")
+    
+    # Not written yet, but already visible, newest last
+    assert conn.execute("SELECT COUNT(*) FROM safety_recent").fetchone()[0] == 0
+    stats = guardrail.get_safety_stats()
+    assert stats['total_checks'] == 3
+    
+    guardrail.flush_stats()
+    assert conn.execute("SELECT COUNT(*) FROM safety_recent").fetchone()[0] == 3
+    assert guardrail.get_safety_stats() == stats
+
+def test_recent_window_is_time_ordered(workdir):
+    guardrail = SafetyGuardrail()
+    for i in range(guardrail.RECENT_WINDOW + 5):
+        guardrail.check_content(f"Article {i} text. " * 20)
+    guardrail.flush_stats()
+    
+    rows = guardrail.stats_store.connection().execute(
+        "SELECT checked_at FROM safety_recent ORDER BY seq"
+    ).fetchall()
+    assert len(rows) == guardrail.RECENT_WINDOW
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+
+def test_seeded_from_existing_reports(workdir):
+    (workdir / 'safety').mkdir()
+    for i, score in enumerate([0.2, 1.0]):
+        report = {'safety_score': score, 'risk_level': 'HIGH' if score < 0.7 else 'LOW',
+                  'passed_all': score == 1.0, 'timestamp': f"2024-01-0{i + 1}T00:00:00"}
+        (workdir / 'safety' / f"safety_report_{i}.json").write_text(json.dumps(report))
+    
+    stats = SafetyGuardrail().get_safety_stats()
+    assert stats['total_checks'] == 2
+    assert stats['high_risk_count'] == 1
+    assert stats['last_check'] == "2024-01-02T00:00:00"
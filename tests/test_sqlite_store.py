@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+import sqlite_store
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork()")
+def test_forked_child_does_not_reuse_inherited_connection(workdir):
+    store = sqlite_store.SQLiteStore(str(workdir / 'fork.db'))
+    parent_conn = store.connection()
+    parent_conn.execute("CREATE TABLE t (x INTEGER)")
+    parent_conn.commit()
+    
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            child_conn = store.connection()
+            child_conn.execute("INSERT INTO t VALUES (1)")
+            child_conn.commit()
+            os.write(write, b'1' if child_conn is not parent_conn else b'0')
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    
+    assert os.read(read, 1) == b'1'
+    assert parent_conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
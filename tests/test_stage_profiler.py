@@ -0,0 +1,40 @@
+import os
+
+from stage_profiler import StageProfiler
+
+def test_summary_written_on_request_only(workdir, capsys):
+    profiler = StageProfiler('profiles', enabled=True)
+    for _ in range(2):
+        with profiler.stage('render'):
+            sum(i * i for i in range(20000))
+        profiler.report()
+    
+    summary_file = os.path.join(profiler.run_dir, 'summary.txt')
+    assert not os.path.exists(summary_file)
+    assert 'render' in capsys.readouterr().out
+    
+    assert profiler.write_summary() == summary_file
+    with open(summary_file) as f:
+        assert 'render' in f.read()
+    
+    row = profiler.summary_rows()[0]
+    assert row['calls'] == 2
+    assert 0 < row['profiled_ms'] <= row['wall_ms']
+
+def test_nested_profilers_only_time_the_inner_stage(workdir):
+    outer = StageProfiler('outer', enabled=True)
+    inner = StageProfiler('inner', enabled=True)
+    
+    with outer.stage('generate'):
+        with inner.stage('monetize'):
+            sum(i * i for i in range(20000))
+    
+    generate = outer.summary_rows()[0]
+    assert generate['profiled_ms'] > 0
+    assert 'enable' not in generate['top_function']
+    
+    monetize = inner.summary_rows()[0]
+    assert monetize['calls'] == 1
+    assert monetize['profiled_ms'] == 0.0
+    assert monetize['wall_ms'] > 0
+    assert os.listdir(inner.run_dir) == []
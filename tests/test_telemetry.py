@@ -0,0 +1,162 @@
+import json
+import queue
+import threading
+from datetime import datetime, timedelta
+
+from ultimate_maker_v7 import (DashboardAggregator, LatencyHistogram, LatencyTracker, OpenMetricsExporter,
+                               TelemetryAggregator, TelemetryCollector, TelemetryEvent, TelemetryRetention,
+                               TelemetryWriter)
+
+TIMESTAMP = '2026-01-01T12:00:00'
+
+def _process_writer(db_path, durations):
+    """A writer with its own in-memory tracker, like another worker process"""
+    tracker = LatencyTracker()
+    writer = TelemetryWriter(db_path, queue.Queue(), latency=tracker)
+    for duration_ms in durations:
+        tracker.record('generate', duration_ms, TIMESTAMP)
+        writer.event_queue.put(('performance', ('generate', duration_ms, 1, TIMESTAMP)))
+    return writer
+
+def _stored(telemetry, minute):
+    row = telemetry.store.connection().execute(
+        "SELECT histogram FROM latency_histograms WHERE minute = ? AND operation = 'generate'", (minute,)
+    ).fetchone()
+    return LatencyHistogram.from_json(row[0])
+
+def test_latency_histograms_merge_across_writers(workdir):
+    telemetry = TelemetryCollector({'retention_schedule_hours': 0})
+    try:
+        first = _process_writer(telemetry.db_path, [10.0, 20.0])
+        second = _process_writer(telemetry.db_path, [500.0])
+        assert first.flush() and second.flush()
+        
+        # A second flush from the first writer only adds its new samples
+        first.latency.record('generate', 30.0, TIMESTAMP)
+        first.event_queue.put(('performance', ('generate', 30.0, 1, TIMESTAMP)))
+        assert first.flush()
+        first.close()
+        second.close()
+        
+        for minute in (TIMESTAMP[:16], LatencyTracker.TOTAL_KEY):
+            histogram = _stored(telemetry, minute)
+            assert histogram.count == 4
+            assert histogram.sum_ms == 560.0
+            assert histogram.max_ms == 500.0
+    finally:
+        telemetry.close()
+
+def test_flush_reports_failed_writes_and_caps_retry_buffer(workdir):
+    writer = TelemetryWriter('telemetry.db', queue.Queue(), batch_size=2, flush_interval=60,
+                             max_buffered_rows=3)
+    try:
+        # No schema yet, so every write fails
+        for i in range(5):
+            writer.event_queue.put(('metrics', ('articles', i, TIMESTAMP, 'test')))
+        assert writer.flush(timeout=5) is False
+        assert writer.rows_written == 0
+        assert writer.rows_discarded == 2
+        
+        writer._connect().execute(
+            "CREATE TABLE metrics (metric_name TEXT, metric_value REAL, timestamp TEXT, component TEXT)"
+        )
+        assert writer.flush(timeout=5) is True
+        assert writer.rows_written == 3
+    finally:
+        writer.close()
+
+def test_dashboard_writers_merge_counts(workdir):
+    start = datetime.now()
+    first = DashboardAggregator('dashboard.json', start, write_interval=60)
+    second = DashboardAggregator('dashboard.json', start, write_interval=60)
+    try:
+        for _ in range(3):
+            first.record(TelemetryEvent('article_generated', 'orchestrator'))
+        second.record(TelemetryEvent('article_generated', 'orchestrator'))
+        second.record(TelemetryEvent('safety_check', 'guardrail'))
+        assert first.write() and second.write()
+        # Nothing new: no rewrite, and the earlier counts stay
+        assert first.write() is False
+    finally:
+        first.close()
+        second.close()
+    
+    with open('dashboard.json') as f:
+        dashboard = json.load(f)
+    assert dashboard['event_counts'] == {'article_generated': 4, 'safety_check': 1}
+    assert len(dashboard['component_activity']['orchestrator']) == 4
+    assert second.snapshot()['event_counts'] == dashboard['event_counts']
+
+def test_forwarder_flush_waits_for_aggregator(workdir):
+    worker = TelemetryCollector({'aggregator_socket': 'aggregator.sock', 'flush_interval': 60})
+    aggregator = None
+    try:
+        # Workers leave the schema to the aggregator
+        tables = worker.store.connection().execute("SELECT name FROM sqlite_master").fetchall()
+        assert tables == []
+        
+        worker.capture_event('article_generated', 'orchestrator', {'word_count': 900})
+        assert worker.flush(timeout=5) is False
+        
+        aggregator = TelemetryAggregator('aggregator.sock', {'retention_schedule_hours': 0})
+        aggregator.start()
+        assert worker.flush(timeout=5) is True
+        
+        count = aggregator.telemetry.store.connection().execute(
+            "SELECT COUNT(*) FROM events WHERE event_type = 'article_generated'"
+        ).fetchone()[0]
+        assert count == 1
+    finally:
+        worker.close()
+        if aggregator is not None:
+            aggregator.stop()
+
+def test_forwarder_mode_keeps_no_histogram_deltas(workdir):
+    worker = TelemetryCollector({'aggregator_socket': 'aggregator.sock', 'flush_interval': 60})
+    try:
+        start = datetime.now() - timedelta(minutes=500)
+        for minute in range(500):
+            timestamp = (start + timedelta(minutes=minute)).isoformat()
+            worker.latency.record('generate', 12.0, timestamp)
+        worker.capture_performance('generate', 12.0, True)
+        
+        # Nothing drains deltas in a worker, so none may pile up
+        assert worker.latency.drain_deltas() == []
+        assert worker.latency.get('generate').count == 501
+    finally:
+        worker.close()
+
+def test_worker_started_before_aggregator_reports_empty_health(workdir):
+    worker = TelemetryCollector({'aggregator_socket': 'aggregator.sock', 'flush_interval': 60})
+    try:
+        worker.capture_performance('generate', 12.0, True)
+        health = worker.get_system_health()
+        assert health['hourly_events'] == 0
+        assert health['success_rate'] == 0
+        assert worker.get_trace('missing') == []
+    finally:
+        worker.close()
+
+def test_retention_creates_database_with_incremental_vacuum(workdir):
+    conn = TelemetryRetention('telemetry/telemetry.db')._connect()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+def test_metrics_render_while_metrics_are_captured(workdir):
+    telemetry = TelemetryCollector({'retention_schedule_hours': 0})
+    exporter = OpenMetricsExporter(telemetry)
+    
+    def capture():
+        for i in range(3000):
+            telemetry.capture_metric(f"metric_{i}", i, 'test')
+    
+    thread = threading.Thread(target=capture)
+    thread.start()
+    try:
+        # Would raise 'dictionary changed size during iteration' without the snapshot
+        while thread.is_alive():
+            exporter.render()
+    finally:
+        thread.join()
+        telemetry.close()
+    
+    assert 'telemetry_metric{metric="metric_2999"} 2999' in exporter.render()
@@ -30,6 +30,10 @@ from urllib.parse import quote, urlencode
 import concurrent.futures
 import schedule
 
+from sqlite_store import get_store
+from stage_profiler import StageProfiler
+from result_cache import ResultCache, content_hash, code_version
+
 # =================== CONFIGURATION ===================
 
 class GodModeConfig:
@@ -101,6 +105,7 @@ class GodModeConfig:
             
             # Database
             'DATABASE_PATH': 'data/profit_master.db',
+            'RESULT_CACHE_PATH': 'data/result_cache.db',
             'BACKUP_PATH': 'backups/',
             
             # Language Settings
@@ -1008,9 +1013,26 @@ class RealAIImageGenerator:
 class ContentVerifier:
     """Content quality verification - Original"""
     
+    def __init__(self, result_cache: ResultCache = None):
+        # Unchanged content/topic is answered from the cache (if one is given) until this class changes
+        self.result_cache = result_cache
+        self.version = code_version(type(self))
+    
     def verify_content(self, content: str, topic: str) -> Dict:
         """Verify content quality - Original"""
+        if self.result_cache is None:
+            return self._verify(content, topic)
+        
+        key = content_hash(content, topic)
+        cached = self.result_cache.get('content_verifier', self.version, key)
+        if cached is not None:
+            return cached
         
+        result = self._verify(content, topic)
+        self.result_cache.put('content_verifier', self.version, key, result)
+        return result
+    
+    def _verify(self, content: str, topic: str) -> Dict:
         checks = {
             'word_count': self._check_word_count(content),
             'readability': self._check_readability(content),
@@ -2892,6 +2914,9 @@ class ProfitMasterSupreme:
         # Initialize database
         self.db = self._init_database()
         
+        # Opt-in per-stage profiling (PROFILE_STAGES=1 or --profile-stages)
+        self.profiler = StageProfiler()
+        
         # Initialize ALL systems
         self._initialize_all_systems()
         
@@ -2919,7 +2944,8 @@ class ProfitMasterSupreme:
     def _init_database(self):
         """Initialize SQLite database"""
         db_path = self.config.get('DATABASE_PATH', 'data/profit_master.db')
-        conn = sqlite3.connect(db_path)
+        self.store = get_store(db_path)
+        conn = self.store.connection()
         cursor = conn.cursor()
         
         # Original tables
@@ -3064,7 +3090,9 @@ class ProfitMasterSupreme:
             except:
                 print("   ⚠️  Image Generator (config incomplete)")
         
-        self.content_verifier = ContentVerifier()
+        self.content_verifier = ContentVerifier(
+            ResultCache(self.config.get('RESULT_CACHE_PATH', 'data/result_cache.db'))
+        )
         print("   ✅ Content Verifier")
         
         self.adsense_guard = AdSenseGuard()
@@ -3147,26 +3175,31 @@ class ProfitMasterSupreme:
         print(f"\n💰 Generating monetized content: {topic}")
         
         try:
+            profiler = self.profiler
+            
             # Generate content
-            if self.multi_agent and self.config.get('ENABLE_MULTI_AGENT'):
-                content_result = self.multi_agent.create_content_with_agents(topic, category)
-            else:
-                content_result = self.ai_generator.generate_article(topic, category, 
-                                                                   self.config.get('MIN_WORD_COUNT', 2500))
+            with profiler.stage("generate"):
+                if self.multi_agent and self.config.get('ENABLE_MULTI_AGENT'):
+                    content_result = self.multi_agent.create_content_with_agents(topic, category)
+                else:
+                    content_result = self.ai_generator.generate_article(topic, category, 
+                                                                       self.config.get('MIN_WORD_COUNT', 2500))
             
             if not content_result['success']:
                 return content_result
             
             # Inject affiliate links
-            monetized_content, affiliate_data = self.affiliate_manager.inject_affiliate_links(
-                content_result['content'],
-                max_links=self.config.get('AFFILIATE_LINKS_PER_ARTICLE', 5)
-            )
+            with profiler.stage("affiliate_links"):
+                monetized_content, affiliate_data = self.affiliate_manager.inject_affiliate_links(
+                    content_result['content'],
+                    max_links=self.config.get('AFFILIATE_LINKS_PER_ARTICLE', 5)
+                )
             
             # Analyze monetization potential
-            monetization_analysis = self.affiliate_manager.analyze_content_for_opportunities(
-                content_result['content']
-            )
+            with profiler.stage("monetization_analysis"):
+                monetization_analysis = self.affiliate_manager.analyze_content_for_opportunities(
+                    content_result['content']
+                )
             
             # Prepare social media posts
             article_data = {
@@ -3176,50 +3209,52 @@ class ProfitMasterSupreme:
                 'url': f"https://yourblog.com/{topic.lower().replace(' ', '-')}"
             }
             
-            social_schedule = self.social_auto_poster.schedule_posts(
-                article_data,
-                ['twitter', 'facebook', 'linkedin']
-            )
+            with profiler.stage("social_schedule"):
+                social_schedule = self.social_auto_poster.schedule_posts(
+                    article_data,
+                    ['twitter', 'facebook', 'linkedin']
+                )
             
             # Calculate estimated revenue
             estimated_revenue = self._estimate_total_revenue(affiliate_data, social_schedule)
             
             # Save to database
-            cursor = self.db.cursor()
-            cursor.execute('''
-                INSERT INTO articles_pro 
-                (title, content, category, word_count, monetization_score, 
-                 affiliate_links, estimated_revenue, social_posts, quality_score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                topic,
-                monetized_content,
-                category,
-                content_result['word_count'],
-                monetization_analysis['monetization_score'],
-                affiliate_data['total_links'],
-                estimated_revenue,
-                len(social_schedule['scheduled_posts']),
-                content_result.get('quality_score', content_result.get('originality_score', 85) * 100)
-            ))
-            
-            article_id = cursor.lastrowid
-            
-            # Save affiliate links
-            for link in affiliate_data['links']:
-                cursor.execute('''
-                    INSERT INTO affiliate_performance (article_id, keyword, network)
-                    VALUES (?, ?, ?)
-                ''', (article_id, link['keyword'], link['network']))
-            
-            # Save social posts
-            for post in social_schedule['scheduled_posts']:
+            with profiler.stage("save_to_database"), self.store.transaction() as conn:
+                cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO social_posts (article_id, platform, content, scheduled_time)
-                    VALUES (?, ?, ?, ?)
-                ''', (article_id, post['platform'], post['hook'], post['scheduled_time']))
-            
-            self.db.commit()
+                    INSERT INTO articles_pro 
+                    (title, content, category, word_count, monetization_score, 
+                     affiliate_links, estimated_revenue, social_posts, quality_score)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    topic,
+                    monetized_content,
+                    category,
+                    content_result['word_count'],
+                    monetization_analysis['monetization_score'],
+                    affiliate_data['total_links'],
+                    estimated_revenue,
+                    len(social_schedule['scheduled_posts']),
+                    content_result.get('quality_score', content_result.get('originality_score', 85) * 100)
+                ))
+            
+                article_id = cursor.lastrowid
+            
+                # Save affiliate links
+                for link in affiliate_data['links']:
+                    cursor.execute('''
+                        INSERT INTO affiliate_performance (article_id, keyword, network)
+                        VALUES (?, ?, ?)
+                    ''', (article_id, link['keyword'], link['network']))
+            
+                # Save social posts
+                for post in social_schedule['scheduled_posts']:
+                    cursor.execute('''
+                        INSERT INTO social_posts (article_id, platform, content, scheduled_time)
+                        VALUES (?, ?, ?, ?)
+                    ''', (article_id, post['platform'], post['hook'], post['scheduled_time']))
+            
+            profiler.report()
             
             print(f"   📊 Monetization score: {monetization_analysis['monetization_score']}/100")
             print(f"   🔗 Affiliate links: {affiliate_data['total_links']}")
@@ -20,6 +20,8 @@ from typing import Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from functools import wraps
 
+from sqlite_store import get_store
+
 # ==========================================
 # 🎨 SYSTEM 1: CORE ENGINE (v5.0 Simulation)
 # ==========================================
@@ -67,10 +69,11 @@ class DatabaseEngine:
     
     def __init__(self, db_path="enterprise_memory.db"):
         self.db_path = db_path
+        self.store = get_store(db_path)
         self._init_db()
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self.store.connection()
         c = conn.cursor()
         # Table for Article History (Audit Trail)
         c.execute('''CREATE TABLE IF NOT EXISTS articles (
@@ -90,30 +93,22 @@ class DatabaseEngine:
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )''')
         conn.commit()
-        conn.close()
 
     def store_article(self, article: Article, status: str = "pending"):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
         content_hash = hashlib.md5((article.title + article.content).encode()).hexdigest()
         
         try:
-            c.execute("INSERT INTO articles (title, content_hash, status) VALUES (?, ?, ?)",
-                      (article.title, content_hash, status))
-            conn.commit()
+            with self.store.transaction() as conn:
+                conn.execute("INSERT INTO articles (title, content_hash, status) VALUES (?, ?, ?)",
+                             (article.title, content_hash, status))
         except sqlite3.IntegrityError:
             print("      [DB] Duplicate detected (Audit Trail active)")
-        finally:
-            conn.close()
         return content_hash
 
     def log_agent_verdict(self, content_hash: str, agent_name: str, score: float, verdict: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("INSERT INTO agent_logs (content_hash, agent_name, score, verdict) VALUES (?, ?, ?, ?)",
-                  (content_hash, agent_name, score, verdict))
-        conn.commit()
-        conn.close()
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO agent_logs (content_hash, agent_name, score, verdict) VALUES (?, ?, ?, ?)",
+                         (content_hash, agent_name, score, verdict))
 
 class ShadowAgents:
     """Risk Mitigation & Quality Control"""
@@ -239,9 +234,8 @@ def generate_dashboard():
     if not os.path.exists(db_path):
         return
     
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
+    c = get_store(db_path).connection().cursor()
+    c.row_factory = sqlite3.Row
     
     # Get Stats
     c.execute("SELECT COUNT(*) as total FROM articles")
@@ -253,8 +247,6 @@ def generate_dashboard():
     c.execute("SELECT title, status, created_at FROM articles ORDER BY id DESC LIMIT 5")
     recent = c.fetchall()
     
-    conn.close()
-    
     # Generate HTML
     html = f"""
     <!DOCTYPE html>
@@ -12,52 +12,1491 @@
 
 import os
 import sys
+import re
 import json
 import time
 import sqlite3
 import threading
 import hashlib
 import statistics
+import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field, asdict
 from enum import Enum
+from types import MappingProxyType
+from collections import deque, OrderedDict
 import concurrent.futures
 import queue
 import inspect
+import atexit
+import contextlib
+import contextvars
+import functools
+import itertools
+import random
+import uuid
+import http.server
+import socket
+import socketserver
+import struct
+import fcntl
+import string
+import csv
+import gzip
+
+from sqlite_store import get_store
+from stage_profiler import StageProfiler
+from result_cache import DEFAULT_CACHE_PATH, ResultCache, content_hash, code_version
 
 # =================== TELEMETRY LAYER ===================
 
 class TelemetryEvent:
     """Telemetry event data structure"""
+    __slots__ = ('timestamp', 'event_type', 'component', 'data', 'event_id')
+    
     def __init__(self, event_type: str, component: str, data: Dict = None):
         self.timestamp = datetime.now().isoformat()
         self.event_type = event_type
         self.component = component
         self.data = data or {}
         self.event_id = hashlib.md5(f"{self.timestamp}{event_type}".encode()).hexdigest()[:8]
+    
+    @classmethod
+    def from_row(cls, row: tuple) -> 'TelemetryEvent':
+        """Rebuild an event from an events-table row"""
+        timestamp, event_type, component, event_id, data = row
+        event = cls.__new__(cls)
+        event.timestamp = timestamp
+        event.event_type = event_type
+        event.component = component
+        event.event_id = event_id
+        event.data = json.loads(data) if data else {}
+        return event
+    
+    def to_dict(self) -> Dict:
+        return {
+            'timestamp': self.timestamp,
+            'event_type': self.event_type,
+            'component': self.component,
+            'event_id': self.event_id,
+            'data': self.data
+        }
+
+class EventRingBuffer:
+    """Fixed-capacity buffer of recent events with optional spill-to-disk"""
+    
+    def __init__(self, capacity: int = 10000, spill_path: str = None,
+                 spill_segment_bytes: int = 50 * 1024 * 1024):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.spill_segment_bytes = spill_segment_bytes
+        self.evicted = 0
+        
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._spill_file = None
+    
+    def append(self, event: TelemetryEvent):
+        with self._lock:
+            if len(self._events) == self.capacity:
+                oldest = self._events[0]
+                self.evicted += 1
+                if self.spill_path:
+                    self._spill(oldest)
+            self._events.append(event)
+    
+    def _spill(self, event: TelemetryEvent):
+        """Append an evicted event to the current spill segment"""
+        try:
+            if self._spill_file is None:
+                self._spill_file = open(self.spill_path, 'a', encoding='utf-8')
+            
+            self._spill_file.write(json.dumps(event.to_dict(), default=str) + '\n')
+            
+            # Rotate: keep one previous segment, drop anything older
+            if self._spill_file.tell() >= self.spill_segment_bytes:
+                self._spill_file.close()
+                self._spill_file = None
+                os.replace(self.spill_path, f"{self.spill_path}.1")
+        except OSError as e:
+            print(f"Telemetry spill error: {e}")
+    
+    def recent(self, limit: int = 10, component: str = None, event_type: str = None) -> List[TelemetryEvent]:
+        """Last N events (newest first), optionally filtered by component/type"""
+        with self._lock:
+            snapshot = list(self._events)
+        
+        results = []
+        for event in reversed(snapshot):
+            if component is not None and event.component != component:
+                continue
+            if event_type is not None and event.event_type != event_type:
+                continue
+            results.append(event)
+            if len(results) >= limit:
+                break
+        
+        return results
+    
+    def close(self):
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+    
+    def __len__(self):
+        return len(self._events)
+    
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._events))
+
+class LatencyHistogram:
+    """Mergeable log-bucketed latency histogram (~5% relative error)"""
+    __slots__ = ('buckets', 'count', 'sum_ms', 'max_ms')
+    
+    GROWTH = 1.1
+    _LOG_GROWTH = math.log(GROWTH)
+    
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+    
+    @classmethod
+    def bucket_index(cls, duration_ms: float) -> int:
+        # Bucket 0 holds everything under 1ms, bucket i covers [GROWTH^(i-1), GROWTH^i)
+        if duration_ms < 1:
+            return 0
+        return int(math.log(duration_ms) / cls._LOG_GROWTH) + 1
+    
+    @classmethod
+    def bucket_value(cls, index: int) -> float:
+        """Representative (geometric mid-point) value of a bucket"""
+        if index == 0:
+            return 0.5
+        return cls.GROWTH ** (index - 0.5)
+    
+    def record(self, duration_ms: float):
+        index = self.bucket_index(duration_ms)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+    
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+    
+    def percentile(self, q: float) -> float:
+        """Approximate q-th percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max_ms)
+        
+        return self.max_ms
+    
+    def cumulative(self, bounds: List[float]) -> List[int]:
+        """Cumulative counts for fixed upper bounds (e.g. Prometheus 'le' buckets)"""
+        counts = [0] * len(bounds)
+        for index, count in self.buckets.items():
+            upper = 1.0 if index == 0 else self.GROWTH ** index
+            for i, bound in enumerate(bounds):
+                if upper <= bound:
+                    counts[i] += count
+                    break
+        
+        running = 0
+        for i, count in enumerate(counts):
+            running += count
+            counts[i] = running
+        return counts
+    
+    def to_json(self) -> str:
+        return json.dumps({'buckets': self.buckets, 'count': self.count, 'sum_ms': self.sum_ms, 'max_ms': self.max_ms})
+    
+    @classmethod
+    def from_json(cls, payload: str) -> 'LatencyHistogram':
+        data = json.loads(payload)
+        histogram = cls()
+        histogram.buckets = {int(index): count for index, count in data.get('buckets', {}).items()}
+        histogram.count = data.get('count', 0)
+        histogram.sum_ms = data.get('sum_ms', 0.0)
+        histogram.max_ms = data.get('max_ms', 0.0)
+        return histogram
+
+class LatencyTracker:
+    """Per-operation latency histograms by minute, plus an all-time histogram"""
+    
+    TOTAL_KEY = 'total'
+    
+    def __init__(self, retention_minutes: int = 24 * 60, track_deltas: bool = True):
+        self.retention_minutes = retention_minutes
+        self.by_minute = {}
+        self.totals = {}
+        # (minute, operation) -> samples recorded since the last write; other
+        # processes share the table, so only these are merged into it. Off when
+        # no writer drains them (workers: the aggregator owns the histograms).
+        self.track_deltas = track_deltas
+        self._deltas = {}
+        self._lock = threading.Lock()
+    
+    def record(self, operation: str, duration_ms: float, timestamp: str):
+        minute = timestamp[:16]
+        
+        with self._lock:
+            minutes = self.by_minute.get(operation)
+            if minutes is None:
+                minutes = self.by_minute[operation] = {}
+            
+            histogram = minutes.get(minute)
+            if histogram is None:
+                histogram = minutes[minute] = LatencyHistogram()
+                self._prune(minutes)
+            histogram.record(duration_ms)
+            
+            total = self.totals.get(operation)
+            if total is None:
+                total = self.totals[operation] = LatencyHistogram()
+            total.record(duration_ms)
+            
+            if not self.track_deltas:
+                return
+            for key in ((minute, operation), (self.TOTAL_KEY, operation)):
+                delta = self._deltas.get(key)
+                if delta is None:
+                    delta = self._deltas[key] = LatencyHistogram()
+                delta.record(duration_ms)
+    
+    def _prune(self, minutes: Dict):
+        cutoff = (datetime.now() - timedelta(minutes=self.retention_minutes)).strftime('%Y-%m-%dT%H:%M')
+        for minute in [m for m in minutes if m < cutoff]:
+            del minutes[minute]
+    
+    def operations(self) -> List[str]:
+        with self._lock:
+            return list(self.totals)
+    
+    def get(self, operation: str, window: int = None) -> LatencyHistogram:
+        """Merged histogram for an operation over the last `window` minutes (None = all time)"""
+        merged = LatencyHistogram()
+        
+        with self._lock:
+            if window is None:
+                if operation in self.totals:
+                    merged.merge(self.totals[operation])
+                return merged
+            
+            cutoff = (datetime.now() - timedelta(minutes=window)).strftime('%Y-%m-%dT%H:%M')
+            for minute, histogram in self.by_minute.get(operation, {}).items():
+                if minute >= cutoff:
+                    merged.merge(histogram)
+        
+        return merged
+    
+    def drain_deltas(self) -> List[tuple]:
+        """(minute, operation, histogram) of the samples recorded since the last call"""
+        with self._lock:
+            rows = [key + (delta,) for key, delta in self._deltas.items()]
+            self._deltas = {}
+        return rows
+    
+    def restore_deltas(self, rows: List[tuple]):
+        """Put back deltas whose write failed so the next write includes them"""
+        with self._lock:
+            for minute, operation, delta in rows:
+                pending = self._deltas.get((minute, operation))
+                if pending is None:
+                    self._deltas[(minute, operation)] = delta
+                else:
+                    pending.merge(delta)
+    
+    def load(self, rows: List[tuple]):
+        """Restore persisted histograms"""
+        cutoff = (datetime.now() - timedelta(minutes=self.retention_minutes)).strftime('%Y-%m-%dT%H:%M')
+        
+        with self._lock:
+            for minute, operation, payload in rows:
+                histogram = LatencyHistogram.from_json(payload)
+                if minute == self.TOTAL_KEY:
+                    self.totals[operation] = histogram
+                elif minute >= cutoff:
+                    self.by_minute.setdefault(operation, {})[minute] = histogram
+
+# Every opener of telemetry.db passes these, so whichever opens it first (collector,
+# writer or the retention CLI) creates it with incremental auto_vacuum
+TELEMETRY_PRAGMAS = {'auto_vacuum': 'INCREMENTAL'}
+
+class TelemetryWriter:
+    """Batched telemetry writer that owns a single long-lived WAL connection"""
+    
+    TABLES = {
+        'events': "INSERT INTO events (timestamp, event_type, component, event_id, data) VALUES (?, ?, ?, ?, ?)",
+        'metrics': "INSERT INTO metrics (metric_name, metric_value, timestamp, component) VALUES (?, ?, ?, ?)",
+        'performance': "INSERT INTO performance (operation, duration_ms, success, timestamp) VALUES (?, ?, ?, ?)",
+        'spans': "INSERT INTO spans (trace_id, span_id, parent_id, name, start_time, duration_ms, success, error, attributes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    }
+    
+    PERF_ROLLUP_UPSERT = '''
+        INSERT INTO perf_rollup_minute
+            (minute, operation, count, sum_ms, min_ms, max_ms, success_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(minute, operation) DO UPDATE SET
+            count = count + excluded.count,
+            sum_ms = sum_ms + excluded.sum_ms,
+            min_ms = MIN(min_ms, excluded.min_ms),
+            max_ms = MAX(max_ms, excluded.max_ms),
+            success_count = success_count + excluded.success_count
+    '''
+    
+    PERF_TOTALS_UPSERT = '''
+        INSERT INTO perf_totals
+            (operation, count, sum_ms, min_ms, max_ms, success_count)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(operation) DO UPDATE SET
+            count = count + excluded.count,
+            sum_ms = sum_ms + excluded.sum_ms,
+            min_ms = MIN(min_ms, excluded.min_ms),
+            max_ms = MAX(max_ms, excluded.max_ms),
+            success_count = success_count + excluded.success_count
+    '''
+    
+    EVENT_ROLLUP_UPSERT = '''
+        INSERT INTO event_rollup_minute (minute, component, event_type, count, dropped)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(minute, component, event_type) DO UPDATE SET
+            count = count + excluded.count,
+            dropped = dropped + excluded.dropped
+    '''
+    
+    # Histograms are JSON, so the merge happens in Python: read, add the delta and
+    # write back inside the batch's write transaction
+    LATENCY_SELECT = "SELECT histogram FROM latency_histograms WHERE minute = ? AND operation = ?"
+    LATENCY_UPSERT = '''
+        INSERT INTO latency_histograms (minute, operation, histogram) VALUES (?, ?, ?)
+        ON CONFLICT(minute, operation) DO UPDATE SET histogram = excluded.histogram
+    '''
+    
+    _STOP = object()
+    
+    class _FlushRequest:
+        """Queued by flush(); ok is only set once everything before it is committed"""
+        
+        def __init__(self):
+            self.done = threading.Event()
+            self.ok = False
+    
+    def __init__(self, db_path: str, event_queue: queue.Queue,
+                 batch_size: int = 200, flush_interval: float = 2.0,
+                 latency: LatencyTracker = None, max_buffered_rows: int = 100000):
+        self.db_path = db_path
+        self.event_queue = event_queue
+        self.latency = latency
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Rows kept for retry while writes fail; the oldest beyond this are discarded
+        self.max_buffered_rows = max_buffered_rows
+        self.rows_written = 0
+        self.rows_discarded = 0
+        self.batches_written = 0
+        self._closed = False
+        
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """The writer thread's shared connection (WAL and pragmas come from the store)"""
+        return get_store(self.db_path, TELEMETRY_PRAGMAS).connection()
+    
+    def _run(self):
+        """Drain the queue and flush rows by batch size or time limit"""
+        conn = self._connect()
+        pending = self._empty_batch()
+        pending_count = 0
+        deadline = None
+        failing = False
+        
+        while True:
+            waiters = []
+            stop = False
+            
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.event_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            # Drain whatever is already queued without blocking again
+            while item is not None:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, self._FlushRequest):
+                    waiters.append(item)
+                else:
+                    table, row = item
+                    pending[table].append(row)
+                    pending_count += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                
+                if stop or (pending_count >= self.batch_size and not failing):
+                    break
+                try:
+                    item = self.event_queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            
+            due = deadline is not None and time.monotonic() >= deadline
+            # While writes fail, a full batch waits for the retry time instead of
+            # retrying on every new row
+            full = pending_count >= self.batch_size and not failing
+            if pending_count and (stop or waiters or due or full):
+                if self._write_batch(conn, pending):
+                    pending = self._empty_batch()
+                    pending_count = 0
+                    deadline = None
+                    failing = False
+                else:
+                    # Keep the rows (up to max_buffered_rows) and retry on the next time limit
+                    self._trim(pending)
+                    pending_count = sum(len(rows) for rows in pending.values())
+                    deadline = time.monotonic() + self.flush_interval
+                    failing = True
+            
+            if waiters:
+                ok = not pending_count and self._confirm_flush()
+                for waiter in waiters:
+                    waiter.ok = ok
+                    waiter.done.set()
+            
+            if stop:
+                break
+        
+        self._finish(conn, pending)
+    
+    def _confirm_flush(self) -> bool:
+        """Rows written by this writer are committed once _write_batch returns"""
+        return True
+    
+    def _finish(self, conn: sqlite3.Connection, pending: Dict[str, List[tuple]]):
+        """Last attempt at anything still pending, then release the connection"""
+        if any(pending.values()) and not self._write_batch(conn, pending):
+            print(f"Telemetry writer stopped with {sum(len(rows) for rows in pending.values())} unwritten rows")
+    
+    def _empty_batch(self) -> Dict[str, List[tuple]]:
+        # 'dropped' rows are sampled-out events that only feed the rollups
+        batch = {table: [] for table in self.TABLES}
+        batch['dropped'] = []
+        return batch
+    
+    def _write_batch(self, conn: sqlite3.Connection, pending: Dict[str, List[tuple]]) -> bool:
+        """Write all pending rows in one transaction"""
+        deltas = self.latency.drain_deltas() if self.latency else []
+        
+        try:
+            # BEGIN IMMEDIATE: the histogram read-merge-write must not interleave
+            # with another process's
+            with get_store(self.db_path, TELEMETRY_PRAGMAS).transaction() as conn:
+                for table, rows in pending.items():
+                    if rows and table in self.TABLES:
+                        conn.executemany(self.TABLES[table], rows)
+                self._write_rollups(conn, pending)
+                if deltas:
+                    self._merge_histograms(conn, deltas)
+        except sqlite3.Error as e:
+            print(f"Telemetry write error: {e}")
+            if deltas:
+                self.latency.restore_deltas(deltas)
+            return False
+        
+        self.rows_written += sum(len(rows) for rows in pending.values())
+        self.batches_written += 1
+        return True
+    
+    def _merge_histograms(self, conn: sqlite3.Connection, deltas: List[tuple]):
+        """Add each delta to the stored histogram (including the 'total' rows)"""
+        rows = []
+        for minute, operation, delta in deltas:
+            stored = conn.execute(self.LATENCY_SELECT, (minute, operation)).fetchone()
+            merged = LatencyHistogram.from_json(stored[0]) if stored else LatencyHistogram()
+            rows.append((minute, operation, merged.merge(delta).to_json()))
+        conn.executemany(self.LATENCY_UPSERT, rows)
+    
+    def _trim(self, pending: Dict[str, List[tuple]]):
+        """Keep the retry buffer bounded by discarding the oldest rows"""
+        excess = sum(len(rows) for rows in pending.values()) - self.max_buffered_rows
+        for rows in pending.values():
+            if excess <= 0:
+                break
+            cut = min(excess, len(rows))
+            del rows[:cut]
+            excess -= cut
+            self.rows_discarded += cut
+    
+    def _write_rollups(self, conn: sqlite3.Connection, pending: Dict[str, List[tuple]]):
+        """Fold the batch into the per-minute and all-time rollup tables"""
+        perf_minute = {}
+        perf_totals = {}
+        for operation, duration_ms, success, timestamp in pending['performance']:
+            for key, bucket in (((timestamp[:16], operation), perf_minute), (operation, perf_totals)):
+                agg = bucket.get(key)
+                if agg is None:
+                    bucket[key] = [1, duration_ms, duration_ms, duration_ms, success]
+                else:
+                    agg[0] += 1
+                    agg[1] += duration_ms
+                    agg[2] = min(agg[2], duration_ms)
+                    agg[3] = max(agg[3], duration_ms)
+                    agg[4] += success
+        
+        event_minute = {}
+        for timestamp, event_type, component, _, _ in pending['events']:
+            key = (timestamp[:16], component, event_type)
+            counts = event_minute.setdefault(key, [0, 0])
+            counts[0] += 1
+        for timestamp, event_type, component in pending['dropped']:
+            key = (timestamp[:16], component, event_type)
+            counts = event_minute.setdefault(key, [0, 0])
+            counts[0] += 1
+            counts[1] += 1
+        
+        if perf_minute:
+            conn.executemany(self.PERF_ROLLUP_UPSERT, [key + tuple(agg) for key, agg in perf_minute.items()])
+            conn.executemany(self.PERF_TOTALS_UPSERT, [(key,) + tuple(agg) for key, agg in perf_totals.items()])
+        if event_minute:
+            conn.executemany(self.EVENT_ROLLUP_UPSERT, [key + tuple(counts) for key, counts in event_minute.items()])
+    
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block until everything queued so far has been written; False if it wasn't"""
+        if self._closed or not self._thread.is_alive():
+            return False
+        
+        request = self._FlushRequest()
+        self.event_queue.put(request)
+        return request.done.wait(timeout) and request.ok
+    
+    def close(self, timeout: float = 30.0):
+        """Flush remaining rows and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        
+        if self._thread.is_alive():
+            self.event_queue.put(self._STOP)
+            self._thread.join(timeout)
+
+class TelemetryForwarder(TelemetryWriter):
+    """Worker-side writer that ships batches to a TelemetryAggregator over a Unix socket"""
+    
+    # Frame asking the aggregator to commit what it has received and answer with one byte
+    FLUSH_FRAME = {'flush': True}
+    ACK_OK = b'\x01'
+    
+    def __init__(self, db_path: str, event_queue: queue.Queue, socket_path: str,
+                 batch_size: int = 200, flush_interval: float = 2.0,
+                 max_buffered_rows: int = 100000, ack_timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.ack_timeout = ack_timeout
+        self.connected = False
+        self._sock = None
+        super().__init__(db_path, event_queue, batch_size, flush_interval,
+                         max_buffered_rows=max_buffered_rows)
+    
+    def _connect(self):
+        self._sock = self._open_socket()
+        return self._sock
+    
+    def _open_socket(self):
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(5)
+            sock.connect(self.socket_path)
+        except OSError:
+            self.connected = False
+            return None
+        
+        self.connected = True
+        return sock
+    
+    def _write_batch(self, sock, pending: Dict[str, List[tuple]]) -> bool:
+        if self._sock is None:
+            self._sock = self._open_socket()
+        
+        if self._sock is not None:
+            try:
+                self._send({table: rows for table, rows in pending.items() if rows})
+                self.rows_written += sum(len(rows) for rows in pending.values())
+                self.batches_written += 1
+                return True
+            except OSError:
+                self._disconnect()
+        
+        # Aggregator down: the rows stay buffered locally and are retried next interval
+        return False
+    
+    def _send(self, payload: Dict):
+        frame = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+        self._sock.sendall(struct.pack('!I', len(frame)) + frame)
+    
+    def _disconnect(self):
+        self._sock.close()
+        self._sock = None
+        self.connected = False
+    
+    def _confirm_flush(self) -> bool:
+        """Sent frames are only in the aggregator's queue; wait for it to commit them"""
+        if self._sock is None:
+            return False
+        
+        try:
+            self._send(self.FLUSH_FRAME)
+            self._sock.settimeout(self.ack_timeout)
+            ack = self._sock.recv(1)
+            self._sock.settimeout(5)
+        except OSError:
+            self._disconnect()
+            return False
+        
+        if not ack:
+            self._disconnect()
+        return ack == self.ACK_OK
+    
+    def _finish(self, sock, pending: Dict[str, List[tuple]]):
+        if any(pending.values()):
+            # Aggregator is gone at exit: write directly so nothing is lost
+            conn = TelemetryWriter._connect(self)
+            if not TelemetryWriter._write_batch(self, conn, pending):
+                print(f"Telemetry forwarder stopped with {sum(len(rows) for rows in pending.values())} unwritten rows")
+        
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+class TelemetryAggregator:
+    """Single process that owns telemetry.db and receives frames from workers"""
+    
+    def __init__(self, socket_path: str = "telemetry/aggregator.sock", config: Dict = None):
+        self.socket_path = socket_path
+        self.frames_received = 0
+        
+        # A local-mode collector owns the DB, writer, rollups and histograms
+        self.telemetry = TelemetryCollector(config)
+        self._server = None
+    
+    def _ingest(self, frame: Dict):
+        telemetry = self.telemetry
+        
+        for table, rows in frame.items():
+            if table not in TelemetryWriter.TABLES and table != 'dropped':
+                continue
+            
+            for row in rows:
+                row = tuple(row)
+                telemetry.event_queue.put((table, row))
+                
+                if table == 'performance':
+                    operation, duration_ms, _, timestamp = row
+                    telemetry.latency.record(operation, duration_ms, timestamp)
+                elif table == 'events':
+                    telemetry.dashboard.record(TelemetryEvent.from_row(row))
+                elif table == 'dropped':
+                    timestamp, event_type, component = row
+                    telemetry.dashboard.record(TelemetryEvent.from_row((timestamp, event_type, component, None, None)))
+        
+        self.frames_received += 1
+    
+    def start(self):
+        """Listen on the Unix socket in a background thread"""
+        aggregator = self
+        
+        class FrameHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    header = self.rfile.read(4)
+                    if len(header) < 4:
+                        return
+                    (length,) = struct.unpack('!I', header)
+                    payload = self.rfile.read(length)
+                    if len(payload) < length:
+                        return
+                    try:
+                        frame = json.loads(payload)
+                    except ValueError as e:
+                        print(f"Telemetry aggregator bad frame: {e}")
+                        continue
+                    
+                    if frame == TelemetryForwarder.FLUSH_FRAME:
+                        # Everything this worker sent is queued ahead of the flush
+                        committed = aggregator.telemetry.flush()
+                        self.wfile.write(TelemetryForwarder.ACK_OK if committed else b'\x00')
+                    else:
+                        aggregator._ingest(frame)
+        
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, FrameHandler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, name="telemetry-aggregator", daemon=True)
+        thread.start()
+    
+    def serve_forever(self):
+        self.start()
+        print(f"📡 Telemetry aggregator listening on {self.socket_path}")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        self.telemetry.close()
+
+class DashboardAggregator:
+    """In-memory dashboard state, snapshotted atomically to dashboard.json
+    
+    Several processes may share one dashboard file, so each write merges this
+    process's changes since its last write into the file under a lock.
+    """
+    
+    def __init__(self, dashboard_path: str, start_time: datetime,
+                 write_interval: float = 5.0, activity_limit: int = 100):
+        self.dashboard_path = dashboard_path
+        self.start_time = start_time
+        self.write_interval = write_interval
+        self.activity_limit = activity_limit
+        
+        self.event_counts = {}
+        self.component_activity = {}
+        self.last_update = None
+        # Changes not yet merged into the file
+        self._pending_counts = {}
+        self._pending_activity = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        
+        self._apply(self._read())
+        
+        self._thread = threading.Thread(target=self._run, name="telemetry-dashboard", daemon=True)
+        self._thread.start()
+    
+    def _read(self) -> Dict:
+        """The dashboard file's contents, or {} if missing or unreadable"""
+        if not self.dashboard_path or not os.path.exists(self.dashboard_path):
+            return {}
+        
+        try:
+            with open(self.dashboard_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _apply(self, dashboard: Dict):
+        """Make the file's state (plus anything still pending) the in-memory state"""
+        with self._lock:
+            self.event_counts = dict(dashboard.get('event_counts', {}))
+            for event_type, count in self._pending_counts.items():
+                self.event_counts[event_type] = self.event_counts.get(event_type, 0) + count
+            
+            self.component_activity = {}
+            for component in set(dashboard.get('component_activity', {})) | set(self._pending_activity):
+                self.component_activity[component] = deque(
+                    dashboard.get('component_activity', {}).get(component, []) + list(self._pending_activity.get(component, [])),
+                    maxlen=self.activity_limit
+                )
+            self.last_update = max(filter(None, (dashboard.get('last_update'), self.last_update)), default=None)
+    
+    def record(self, event: TelemetryEvent):
+        """Count an event in memory"""
+        entry = {
+            'timestamp': event.timestamp,
+            'event_type': event.event_type
+        }
+        
+        with self._lock:
+            self.event_counts[event.event_type] = self.event_counts.get(event.event_type, 0) + 1
+            
+            activity = self.component_activity.get(event.component)
+            if activity is None:
+                activity = self.component_activity[event.component] = deque(maxlen=self.activity_limit)
+            activity.append(entry)
+            
+            if self.dashboard_path:
+                self._pending_counts[event.event_type] = self._pending_counts.get(event.event_type, 0) + 1
+                pending = self._pending_activity.get(event.component)
+                if pending is None:
+                    pending = self._pending_activity[event.component] = deque(maxlen=self.activity_limit)
+                pending.append(entry)
+            
+            self.last_update = event.timestamp
+    
+    def snapshot(self) -> Dict:
+        """Dashboard dict in the dashboard.json schema"""
+        with self._lock:
+            return {
+                'event_counts': dict(self.event_counts),
+                'component_activity': {
+                    component: list(activity)
+                    for component, activity in self.component_activity.items()
+                },
+                'last_update': self.last_update,
+                'uptime_seconds': (datetime.now() - self.start_time).total_seconds()
+            }
+    
+    def write(self, force: bool = False) -> bool:
+        """Merge pending changes into the file (temp file + rename) if there are any"""
+        if not self.dashboard_path:
+            return False
+        
+        with self._lock:
+            counts, self._pending_counts = self._pending_counts, {}
+            activity, self._pending_activity = self._pending_activity, {}
+        if not (counts or force):
+            return False
+        
+        tmp_path = f"{self.dashboard_path}.{os.getpid()}.tmp"
+        try:
+            with open(f"{self.dashboard_path}.lock", 'w') as lock:
+                # Read-merge-rename under the lock so other processes' counts survive
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                dashboard = self._read()
+                
+                merged_counts = dashboard.setdefault('event_counts', {})
+                for event_type, count in counts.items():
+                    merged_counts[event_type] = merged_counts.get(event_type, 0) + count
+                merged_activity = dashboard.setdefault('component_activity', {})
+                for component, entries in activity.items():
+                    merged_activity[component] = (merged_activity.get(component, []) + list(entries))[-self.activity_limit:]
+                with self._lock:
+                    last_update = self.last_update
+                dashboard['last_update'] = max(filter(None, (dashboard.get('last_update'), last_update)), default=None)
+                dashboard['uptime_seconds'] = (datetime.now() - self.start_time).total_seconds()
+                
+                with open(tmp_path, 'w') as f:
+                    json.dump(dashboard, f, indent=2)
+                os.replace(tmp_path, self.dashboard_path)
+        except OSError as e:
+            print(f"Dashboard write error: {e}")
+            # Keep the changes for the next write
+            with self._lock:
+                for event_type, count in counts.items():
+                    self._pending_counts[event_type] = self._pending_counts.get(event_type, 0) + count
+                for component, entries in activity.items():
+                    entries.extend(self._pending_activity.get(component, []))
+                    self._pending_activity[component] = entries
+            return False
+        
+        self._apply(dashboard)
+        return True
+    
+    def _run(self):
+        while not self._stop.wait(self.write_interval):
+            self.write()
+    
+    def close(self):
+        """Stop the background thread and write the final snapshot"""
+        self._stop.set()
+        self._thread.join(self.write_interval + 1)
+        self.write()
+
+_current_span = contextvars.ContextVar('telemetry_current_span', default=None)
+
+class Span:
+    """A single timed operation inside a trace"""
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'sampled', 'attributes',
+                 'start_time', 'duration_ms', 'success', 'error', '_start')
+    
+    def __init__(self, name: str, trace_id: str, parent_id: str = None,
+                 sampled: bool = True, attributes: Dict = None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.start_time = datetime.now().isoformat()
+        self.duration_ms = 0.0
+        self.success = True
+        self.error = None
+        self._start = time.perf_counter()
+    
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+    
+    def to_row(self) -> tuple:
+        return (
+            self.trace_id, self.span_id, self.parent_id, self.name, self.start_time,
+            round(self.duration_ms, 3), 1 if self.success else 0, self.error,
+            json.dumps(self.attributes, default=str) if self.attributes else None
+        )
+
+class Tracer:
+    """Nested span tracing via contextvars for sync and async code"""
+    
+    def __init__(self, telemetry: 'TelemetryCollector', sample_rate: float = 1.0):
+        self.telemetry = telemetry
+        self.sample_rate = sample_rate
+    
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+    
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Open a child of the current span (or a new sampled/unsampled trace)"""
+        parent = _current_span.get()
+        if parent is None:
+            # Sampling is decided once per trace so traces are never partial
+            span = Span(name, uuid.uuid4().hex[:16], None,
+                        random.random() < self.sample_rate, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+        
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.success = False
+            span.error = str(e)[:200]
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            if span.sampled:
+                self.telemetry.capture_span(span)
+    
+    def trace(self, name: str = None):
+        """Decorator that runs a def or async def function inside a span"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+            
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+            
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        
+        return decorator
+
+class TelemetrySampler:
+    """Per-event-type sampling, rate limits and payload truncation"""
+    
+    DEFAULT_POLICY = {
+        'default_rate': 1.0,
+        # Noisy, high-volume event types
+        'rates': {
+            'agent_evaluation': 0.2,
+            'dry_run_simulation': 0.5
+        },
+        # Max persisted events per minute per type (0 = unlimited)
+        'max_per_minute': {},
+        # Event types containing any of these are always kept
+        'always_keep': ['error', 'failed', 'blocked'],
+        'max_string_chars': 1000,
+        'max_list_items': 50,
+        'max_depth': 4
+    }
+    
+    def __init__(self, policy: Dict = None):
+        self.policy = dict(self.DEFAULT_POLICY)
+        for key, value in (policy or {}).items():
+            if isinstance(value, dict) and isinstance(self.policy.get(key), dict):
+                self.policy[key] = {**self.policy[key], **value}
+            else:
+                self.policy[key] = value
+        
+        self.kept = 0
+        self.dropped = {}
+        self.truncated = 0
+        self._window = {}
+        self._lock = threading.Lock()
+    
+    def should_keep(self, event_type: str, data: Dict = None) -> bool:
+        """Decide whether an event is persisted"""
+        if self._always_keep(event_type, data):
+            with self._lock:
+                self.kept += 1
+            return True
+        
+        rate = self.policy['rates'].get(event_type, self.policy['default_rate'])
+        keep = rate >= 1.0 or random.random() < rate
+        
+        with self._lock:
+            limit = self.policy['max_per_minute'].get(event_type, 0)
+            if keep and limit:
+                minute = int(time.time() // 60)
+                window_minute, count = self._window.get(event_type, (minute, 0))
+                if window_minute != minute:
+                    count = 0
+                keep = count < limit
+                self._window[event_type] = (minute, count + 1 if keep else count)
+            
+            if keep:
+                self.kept += 1
+            else:
+                self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+        
+        return keep
+    
+    def _always_keep(self, event_type: str, data: Dict = None) -> bool:
+        if data and 'error' in data:
+            return True
+        return any(marker in event_type for marker in self.policy['always_keep'])
+    
+    def truncate(self, data: Dict) -> Dict:
+        """Cap string lengths, list sizes and nesting depth of a payload"""
+        if not data:
+            return data
+        
+        truncated = []
+        result = self._truncate_value(data, 0, truncated)
+        if truncated:
+            with self._lock:
+                self.truncated += 1
+        return result
+    
+    def _truncate_value(self, value, depth: int, truncated: List):
+        max_chars = self.policy['max_string_chars']
+        max_items = self.policy['max_list_items']
+        
+        if isinstance(value, str):
+            if len(value) > max_chars:
+                truncated.append(True)
+                return value[:max_chars] + f"...[{len(value) - max_chars} chars truncated]"
+            return value
+        
+        if isinstance(value, dict):
+            if depth >= self.policy['max_depth']:
+                truncated.append(True)
+                return f"<dict with {len(value)} keys>"
+            return {k: self._truncate_value(v, depth + 1, truncated) for k, v in value.items()}
+        
+        if isinstance(value, (list, tuple)):
+            if depth >= self.policy['max_depth']:
+                truncated.append(True)
+                return f"<list with {len(value)} items>"
+            items = [self._truncate_value(v, depth + 1, truncated) for v in value[:max_items]]
+            if len(value) > max_items:
+                truncated.append(True)
+                items.append(f"...[{len(value) - max_items} items truncated]")
+            return items
+        
+        return value
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'kept': self.kept,
+                'dropped': dict(self.dropped),
+                'total_dropped': sum(self.dropped.values()),
+                'truncated_payloads': self.truncated
+            }
+
+class TelemetryRetention:
+    """Prune raw telemetry, downsample it to hourly aggregates and reclaim space"""
+    
+    def __init__(self, db_path: str, retention_days: int = 14,
+                 chunk_size: int = 5000, vacuum_pages: int = 500, pause: float = 0.05):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.chunk_size = chunk_size
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+    
+    def _connect(self) -> sqlite3.Connection:
+        return get_store(self.db_path, TELEMETRY_PRAGMAS).connection()
+    
+    def _init_tables(self, conn: sqlite3.Connection):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS perf_rollup_hour (
+                hour TEXT,
+                operation TEXT,
+                count INTEGER DEFAULT 0,
+                sum_ms REAL DEFAULT 0,
+                min_ms REAL,
+                max_ms REAL,
+                success_count INTEGER DEFAULT 0,
+                PRIMARY KEY (hour, operation)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS event_rollup_hour (
+                hour TEXT,
+                component TEXT,
+                event_type TEXT,
+                count INTEGER DEFAULT 0,
+                dropped INTEGER DEFAULT 0,
+                PRIMARY KEY (hour, component, event_type)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS metrics_rollup_hour (
+                hour TEXT,
+                metric_name TEXT,
+                component TEXT,
+                count INTEGER DEFAULT 0,
+                sum_value REAL DEFAULT 0,
+                min_value REAL,
+                max_value REAL,
+                PRIMARY KEY (hour, metric_name, component)
+            )
+        ''')
+        conn.commit()
+    
+    def run(self) -> Dict:
+        """Run one retention pass"""
+        started = time.time()
+        # Hour-aligned so an hour is never split between minute and hour rollups
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y-%m-%dT%H:00')
+        
+        conn = self._connect()
+        self._init_tables(conn)
+        
+        stats = {'cutoff': cutoff, 'deleted': {}}
+        stats['downsampled'] = self._downsample_rollups(conn, cutoff)
+        stats['deleted']['metrics'] = self._delete_older(conn, 'metrics', 'timestamp', cutoff, self._downsample_metrics)
+        stats['deleted']['events'] = self._delete_older(conn, 'events', 'timestamp', cutoff)
+        stats['deleted']['performance'] = self._delete_older(conn, 'performance', 'timestamp', cutoff)
+        stats['deleted']['spans'] = self._delete_older(conn, 'spans', 'start_time', cutoff)
+        
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM latency_histograms WHERE minute < ? AND minute != ?",
+                (cutoff[:16], LatencyTracker.TOTAL_KEY)
+            )
+            stats['deleted']['latency_histograms'] = cursor.rowcount
+        
+        stats['vacuumed_pages'] = self._incremental_vacuum(conn)
+        
+        stats['duration_seconds'] = round(time.time() - started, 2)
+        return stats
+    
+    def _downsample_rollups(self, conn: sqlite3.Connection, cutoff: str) -> Dict:
+        """Fold minute rollups older than the cutoff into hourly rollups"""
+        minute_cutoff = cutoff[:16]
+        
+        with conn:
+            conn.execute('''
+                INSERT INTO perf_rollup_hour
+                SELECT substr(minute, 1, 13), operation, SUM(count), SUM(sum_ms),
+                       MIN(min_ms), MAX(max_ms), SUM(success_count)
+                FROM perf_rollup_minute WHERE minute < ?
+                GROUP BY substr(minute, 1, 13), operation
+                ON CONFLICT(hour, operation) DO UPDATE SET
+                    count = count + excluded.count,
+                    sum_ms = sum_ms + excluded.sum_ms,
+                    min_ms = MIN(min_ms, excluded.min_ms),
+                    max_ms = MAX(max_ms, excluded.max_ms),
+                    success_count = success_count + excluded.success_count
+            ''', (minute_cutoff,))
+            perf_rows = conn.execute("DELETE FROM perf_rollup_minute WHERE minute < ?", (minute_cutoff,)).rowcount
+            
+            conn.execute('''
+                INSERT INTO event_rollup_hour
+                SELECT substr(minute, 1, 13), component, event_type, SUM(count), SUM(dropped)
+                FROM event_rollup_minute WHERE minute < ?
+                GROUP BY substr(minute, 1, 13), component, event_type
+                ON CONFLICT(hour, component, event_type) DO UPDATE SET
+                    count = count + excluded.count,
+                    dropped = dropped + excluded.dropped
+            ''', (minute_cutoff,))
+            event_rows = conn.execute("DELETE FROM event_rollup_minute WHERE minute < ?", (minute_cutoff,)).rowcount
+        
+        return {'perf_rollup_minute': perf_rows, 'event_rollup_minute': event_rows}
+    
+    def _downsample_metrics(self, conn: sqlite3.Connection, max_id: int, cutoff: str):
+        conn.execute('''
+            INSERT INTO metrics_rollup_hour
+            SELECT substr(timestamp, 1, 13), metric_name, component, COUNT(*),
+                   SUM(metric_value), MIN(metric_value), MAX(metric_value)
+            FROM metrics WHERE id <= ? AND timestamp < ?
+            GROUP BY substr(timestamp, 1, 13), metric_name, component
+            ON CONFLICT(hour, metric_name, component) DO UPDATE SET
+                count = count + excluded.count,
+                sum_value = sum_value + excluded.sum_value,
+                min_value = MIN(min_value, excluded.min_value),
+                max_value = MAX(max_value, excluded.max_value)
+        ''', (max_id, cutoff))
+    
+    def _delete_older(self, conn: sqlite3.Connection, table: str, column: str,
+                      cutoff: str, before_delete=None) -> int:
+        """Delete rows older than the cutoff in short transactions"""
+        deleted = 0
+        
+        while True:
+            # Rows are appended in time order, so walking ids stops at the cutoff
+            cursor = conn.execute(
+                f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE {column} < ? ORDER BY id LIMIT ?)",
+                (cutoff, self.chunk_size)
+            )
+            max_id = cursor.fetchone()[0]
+            if max_id is None:
+                break
+            
+            with conn:
+                if before_delete:
+                    before_delete(conn, max_id, cutoff)
+                cursor = conn.execute(f"DELETE FROM {table} WHERE id <= ? AND {column} < ?", (max_id, cutoff))
+                deleted += cursor.rowcount
+            
+            # Let the writer in between chunks
+            time.sleep(self.pause)
+        
+        return deleted
+    
+    def _incremental_vacuum(self, conn: sqlite3.Connection) -> int:
+        """Reclaim free pages a few hundred at a time"""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        
+        vacuumed = 0
+        while True:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_pages:
+                break
+            # executescript steps the pragma to completion (execute() frees a single page)
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            freed = free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if freed <= 0:
+                break
+            vacuumed += freed
+            time.sleep(self.pause)
+        
+        # Passive checkpoint so the file actually shrinks without blocking the writer
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return vacuumed
+    
+    def enable_incremental_vacuum(self):
+        """One-off full VACUUM that switches an existing DB to incremental auto_vacuum"""
+        conn = self._connect()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+class OpenMetricsExporter:
+    """Serve in-memory telemetry in OpenMetrics text format on a local port"""
+    
+    CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+    LATENCY_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+    
+    def __init__(self, telemetry: 'TelemetryCollector', host: str = '127.0.0.1', port: int = 9464):
+        self.telemetry = telemetry
+        self.host = host
+        self.port = port
+        self._server = None
+    
+    @staticmethod
+    def _labels(**labels) -> str:
+        escaped = []
+        for key, value in labels.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{key}="{value}"')
+        return '{' + ','.join(escaped) + '}'
+    
+    def render(self) -> str:
+        """Render all families; reads memory only, never SQLite"""
+        telemetry = self.telemetry
+        lines = []
+        
+        dashboard = telemetry.dashboard.snapshot()
+        lines.append('# TYPE telemetry_events counter')
+        lines.append('# HELP telemetry_events Events captured by type')
+        for event_type, count in sorted(dashboard['event_counts'].items()):
+            lines.append(f'telemetry_events_total{self._labels(event_type=event_type)} {count}')
+        
+        sampling = telemetry.sampler.get_stats()
+        lines.append('# TYPE telemetry_events_dropped counter')
+        lines.append('# HELP telemetry_events_dropped Events not persisted because of sampling')
+        for event_type, count in sorted(sampling['dropped'].items()):
+            lines.append(f'telemetry_events_dropped_total{self._labels(event_type=event_type)} {count}')
+        
+        lines.append('# TYPE telemetry_rows_written counter')
+        lines.append(f'telemetry_rows_written_total {telemetry.writer.rows_written}')
+        
+        lines.append('# TYPE telemetry_rows_discarded counter')
+        lines.append('# HELP telemetry_rows_discarded Rows dropped from the retry buffer while writes failed')
+        lines.append(f'telemetry_rows_discarded_total {telemetry.writer.rows_discarded}')
+        
+        lines.append('# TYPE telemetry_queue_depth gauge')
+        lines.append(f'telemetry_queue_depth {telemetry.event_queue.qsize()}')
+        
+        lines.append('# TYPE telemetry_buffered_events gauge')
+        lines.append(f'telemetry_buffered_events {len(telemetry.events)}')
+        
+        lines.append('# TYPE telemetry_uptime_seconds gauge')
+        lines.append(f'telemetry_uptime_seconds {round((datetime.now() - telemetry.start_time).total_seconds(), 3)}')
+        
+        lines.append('# TYPE telemetry_metric gauge')
+        lines.append('# HELP telemetry_metric Last value of each captured metric')
+        for metric_name, value in sorted(telemetry.get_last_metric_values().items()):
+            lines.append(f'telemetry_metric{self._labels(metric=metric_name)} {value}')
+        
+        cache_stats = telemetry.get_cache_stats()
+        for family, key in (('hits', 'hits'), ('misses', 'misses'), ('evictions', 'evictions')):
+            lines.append(f'# TYPE telemetry_cache_{family} counter')
+            for cache_name, stats in sorted(cache_stats.items()):
+                lines.append(f'telemetry_cache_{family}_total{self._labels(cache=cache_name)} {stats[key]}')
+        lines.append('# TYPE telemetry_cache_size gauge')
+        for cache_name, stats in sorted(cache_stats.items()):
+            lines.append(f'telemetry_cache_size{self._labels(cache=cache_name)} {stats["size"]}')
+        
+        lines.append('# TYPE telemetry_latency_ms histogram')
+        lines.append('# UNIT telemetry_latency_ms ms')
+        bounds = self.LATENCY_BOUNDS_MS
+        for operation in sorted(telemetry.latency.operations()):
+            histogram = telemetry.latency.get(operation)
+            for bound, count in zip(bounds, histogram.cumulative(bounds)):
+                lines.append(f'telemetry_latency_ms_bucket{self._labels(operation=operation, le=bound)} {count}')
+            lines.append(f'telemetry_latency_ms_bucket{self._labels(operation=operation, le="+Inf")} {histogram.count}')
+            lines.append(f'telemetry_latency_ms_count{self._labels(operation=operation)} {histogram.count}')
+            lines.append(f'telemetry_latency_ms_sum{self._labels(operation=operation)} {round(histogram.sum_ms, 3)}')
+        
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+    
+    def start(self):
+        """Start the HTTP endpoint in a daemon thread"""
+        exporter = self
+        
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', exporter.CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, name="telemetry-metrics", daemon=True)
+        thread.start()
+        return self._server.server_address
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
 
 class TelemetryCollector:
     """Non-invasive telemetry collection"""
     
     def __init__(self, config: Dict = None):
         self.config = config or {}
-        self.events = []
         self.metrics = {}
+        self._metrics_lock = threading.Lock()
         self.start_time = datetime.now()
         
         # Create telemetry database
         self.db_path = "telemetry/telemetry.db"
         os.makedirs("telemetry", exist_ok=True)
-        self._init_database()
+        
+        # Workers forward to an aggregator process instead of writing the DB;
+        # the aggregator creates the schema and owns the persisted state
+        self.aggregator_socket = self.config.get('aggregator_socket')
+        
+        # Incremental auto_vacuum has to be set before the first table on a new DB
+        self.store = get_store(self.db_path, TELEMETRY_PRAGMAS)
+        if not self.aggregator_socket:
+            self._init_database()
+        
+        # Recent events are kept in a bounded ring buffer
+        self.events = EventRingBuffer(
+            capacity=self.config.get('event_buffer_size', 10000),
+            spill_path="telemetry/events_spill.jsonl" if self.config.get('spill_evicted_events') else None
+        )
+        
+        # Sampling / truncation policy for persisted events
+        self.sampler = TelemetrySampler(self.config.get('sampling'))
+        
+        # Span tracing, buffered through the batched writer
+        self.tracer = Tracer(self, sample_rate=self.config.get('trace_sample_rate', 1.0))
+        
+        # Latency histograms are kept in memory and persisted by the writer
+        # (in forwarder mode the aggregator records and persists them from the rows)
+        self.latency = LatencyTracker(
+            retention_minutes=self.config.get('latency_retention_minutes', 24 * 60),
+            track_deltas=not self.aggregator_socket
+        )
+        if not self.aggregator_socket:
+            self._load_latency_histograms()
+        
+        # In-memory state behind get_content_quality_score
+        self._score_lock = threading.Lock()
+        self._operation_totals = {}
+        self._recent_word_counts = deque(maxlen=10)
+        self._topic_score_cache = (None, 0.7)
+        self._quality_cache = None
+        self.quality_cache_ttl = self.config.get('quality_cache_ttl', 30)
+        if not self.aggregator_socket:
+            self._load_score_state()
+        
+        # Caches owned by other components, exported alongside telemetry metrics
+        self.caches = {}
         
         # Event queue for async processing
         self.event_queue = queue.Queue()
         self._start_processor()
+        
+        # Dashboard state lives in memory and is snapshotted in the background
+        self.dashboard = DashboardAggregator(
+            None if self.aggregator_socket else "telemetry/dashboard.json",
+            self.start_time,
+            write_interval=self.config.get('dashboard_interval', 5.0)
+        )
+        
+        # Retention runs in the background for long-running processes;
+        # the first pass is one interval after start-up
+        self.retention = TelemetryRetention(self.db_path, retention_days=self.config.get('retention_days', 14))
+        self._retention_stop = threading.Event()
+        retention_hours = self.config.get('retention_schedule_hours', 6)
+        if retention_hours and not self.aggregator_socket:
+            self._start_retention_schedule(retention_hours)
+        
+        # Optional local /metrics endpoint
+        self.exporter = None
+        if self.config.get('metrics_port'):
+            self.start_metrics_server(self.config['metrics_port'], self.config.get('metrics_host', '127.0.0.1'))
+        
+        # Don't drop queued rows when the process exits
+        atexit.register(self.close)
     
     def _init_database(self):
         """Initialize telemetry database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.store.connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -91,139 +1530,357 @@ class TelemetryCollector:
             )
         ''')
         
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS spans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trace_id TEXT,
+                span_id TEXT,
+                parent_id TEXT,
+                name TEXT,
+                start_time TEXT,
+                duration_ms REAL,
+                success INTEGER,
+                error TEXT,
+                attributes TEXT
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans (trace_id)")
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_performance_operation_ts ON performance (operation, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (event_type, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_name_ts ON metrics (metric_name, timestamp)")
+        
+        self._init_rollups(cursor)
+        
         conn.commit()
-        conn.close()
+    
+    def _init_rollups(self, cursor: sqlite3.Cursor):
+        """Create pre-aggregated rollup tables, backfilling them on first use"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'perf_rollup_minute'")
+        needs_backfill = cursor.fetchone() is None
+        
+        # Minute keys are the first 16 chars of the ISO timestamp (YYYY-MM-DDTHH:MM)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS perf_rollup_minute (
+                minute TEXT,
+                operation TEXT,
+                count INTEGER DEFAULT 0,
+                sum_ms REAL DEFAULT 0,
+                min_ms REAL,
+                max_ms REAL,
+                success_count INTEGER DEFAULT 0,
+                PRIMARY KEY (minute, operation)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS perf_totals (
+                operation TEXT PRIMARY KEY,
+                count INTEGER DEFAULT 0,
+                sum_ms REAL DEFAULT 0,
+                min_ms REAL,
+                max_ms REAL,
+                success_count INTEGER DEFAULT 0
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS event_rollup_minute (
+                minute TEXT,
+                component TEXT,
+                event_type TEXT,
+                count INTEGER DEFAULT 0,
+                dropped INTEGER DEFAULT 0,
+                PRIMARY KEY (minute, component, event_type)
+            )
+        ''')
+        
+        # 'count' is the true total, 'dropped' how many of those were sampled out
+        cursor.execute("PRAGMA table_info(event_rollup_minute)")
+        if 'dropped' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE event_rollup_minute ADD COLUMN dropped INTEGER DEFAULT 0")
+        
+        # Latency histograms per (minute, operation); minute 'total' holds the all-time histogram
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS latency_histograms (
+                minute TEXT,
+                operation TEXT,
+                histogram TEXT,
+                PRIMARY KEY (minute, operation)
+            )
+        ''')
+        
+        if not needs_backfill:
+            return
+        
+        cursor.execute('''
+            INSERT INTO perf_rollup_minute
+            SELECT substr(timestamp, 1, 16), operation, COUNT(*), SUM(duration_ms),
+                   MIN(duration_ms), MAX(duration_ms), SUM(success)
+            FROM performance GROUP BY substr(timestamp, 1, 16), operation
+        ''')
+        cursor.execute('''
+            INSERT INTO perf_totals
+            SELECT operation, COUNT(*), SUM(duration_ms), MIN(duration_ms), MAX(duration_ms), SUM(success)
+            FROM performance GROUP BY operation
+        ''')
+        cursor.execute('''
+            INSERT INTO event_rollup_minute
+            SELECT substr(timestamp, 1, 16), component, event_type, COUNT(*), 0
+            FROM events GROUP BY substr(timestamp, 1, 16), component, event_type
+        ''')
     
     def _start_processor(self):
-        """Start async event processor"""
-        def processor():
-            while True:
-                try:
-                    event = self.event_queue.get(timeout=1)
-                    self._store_event(event)
-                except queue.Empty:
-                    continue
+        """Start async batched writer (or forwarder when an aggregator owns the DB)"""
+        if self.aggregator_socket:
+            self.writer = TelemetryForwarder(
+                self.db_path,
+                self.event_queue,
+                self.aggregator_socket,
+                batch_size=self.config.get('batch_size', 200),
+                flush_interval=self.config.get('flush_interval', 2.0)
+            )
+            return
+        
+        self.writer = TelemetryWriter(
+            self.db_path,
+            self.event_queue,
+            batch_size=self.config.get('batch_size', 200),
+            flush_interval=self.config.get('flush_interval', 2.0),
+            latency=self.latency
+        )
+    
+    def _load_score_state(self):
+        """Seed quality-score state from the rollups and the last few articles"""
+        conn = self.store.connection()
+        cursor = conn.cursor()
         
-        thread = threading.Thread(target=processor, daemon=True)
-        thread.start()
+        cursor.execute("SELECT operation, count, success_count FROM perf_totals")
+        for operation, count, success_count in cursor.fetchall():
+            self._operation_totals[operation] = [count, success_count]
+        
+        cursor.execute(
+            "SELECT data FROM events WHERE event_type = 'article_generated' ORDER BY timestamp DESC LIMIT 10"
+        )
+        for (data,) in reversed(cursor.fetchall()):
+            try:
+                word_count = json.loads(data).get('word_count')
+            except (TypeError, ValueError, AttributeError):
+                continue
+            if word_count is not None:
+                self._recent_word_counts.append(word_count)
+    
+    def _load_latency_histograms(self):
+        """Restore persisted latency histograms"""
+        since = (datetime.now() - timedelta(minutes=self.latency.retention_minutes)).strftime('%Y-%m-%dT%H:%M')
+        
+        conn = self.store.connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT minute, operation, histogram FROM latency_histograms WHERE minute >= ? OR minute = ?",
+            (since, LatencyTracker.TOTAL_KEY)
+        )
+        self.latency.load(cursor.fetchall())
     
     def capture_event(self, event_type: str, component: str, data: Dict = None):
         """Capture telemetry event without modifying original code"""
-        event = TelemetryEvent(event_type, component, data)
+        event = TelemetryEvent(event_type, component, self.sampler.truncate(data))
         self.events.append(event)
-        self.event_queue.put(event)
+        
+        if event_type == 'article_generated' and data and 'word_count' in data:
+            with self._score_lock:
+                self._recent_word_counts.append(data['word_count'])
+                self._quality_cache = None
+        
+        if self.sampler.should_keep(event_type, event.data):
+            self._store_event(event)
+        else:
+            # Not persisted, but still counted in the rollups
+            self.event_queue.put(('dropped', (event.timestamp, event_type, component)))
         
         # Real-time dashboard update
         self._update_dashboard(event)
         
         return event.event_id
     
+    def register_cache(self, name: str, cache: 'TTLCache'):
+        """Export a cache's hit/miss counters on the metrics endpoint"""
+        self.caches[name] = cache
+    
+    def get_cache_stats(self) -> Dict:
+        return {name: cache.get_stats() for name, cache in self.caches.items()}
+    
     def capture_metric(self, metric_name: str, value: float, component: str):
         """Capture metric"""
         timestamp = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.event_queue.put(('metrics', (metric_name, value, timestamp, component)))
         
-        cursor.execute(
-            "INSERT INTO metrics (metric_name, metric_value, timestamp, component) VALUES (?, ?, ?, ?)",
-            (metric_name, value, timestamp, component)
-        )
-        
-        conn.commit()
-        conn.close()
-        
-        # Update in-memory metrics
-        if metric_name not in self.metrics:
-            self.metrics[metric_name] = []
-        self.metrics[metric_name].append(value)
+        # Update in-memory metrics (read concurrently by the /metrics endpoint)
+        with self._metrics_lock:
+            if metric_name not in self.metrics:
+                self.metrics[metric_name] = []
+            self.metrics[metric_name].append(value)
+    
+    def get_last_metric_values(self) -> Dict[str, float]:
+        """Latest value of every captured metric, copied under the metrics lock"""
+        with self._metrics_lock:
+            return {metric_name: values[-1] for metric_name, values in self.metrics.items() if values}
     
     def capture_performance(self, operation: str, duration_ms: float, success: bool):
         """Capture performance metrics"""
         timestamp = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "INSERT INTO performance (operation, duration_ms, success, timestamp) VALUES (?, ?, ?, ?)",
-            (operation, duration_ms, 1 if success else 0, timestamp)
-        )
+        self.latency.record(operation, duration_ms, timestamp)
+        self.event_queue.put(('performance', (operation, duration_ms, 1 if success else 0, timestamp)))
         
-        conn.commit()
-        conn.close()
+        with self._score_lock:
+            totals = self._operation_totals.get(operation)
+            if totals is None:
+                totals = self._operation_totals[operation] = [0, 0]
+            totals[0] += 1
+            totals[1] += 1 if success else 0
+            
+            # Only operations that feed the quality score invalidate it
+            name = operation.lower()
+            if 'gemini' in name or 'wordpress' in name:
+                self._quality_cache = None
     
-    def _store_event(self, event: TelemetryEvent):
-        """Store event in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_latency_percentiles(self, operation: str, window: int = 60) -> Dict:
+        """Get p50/p90/p99/max latency for an operation over the last `window` minutes
+        
+        An exact operation name is used when known; otherwise every operation
+        containing the string is merged (e.g. 'gemini'). window=None means all time.
+        """
+        operations = self.latency.operations()
+        if operation not in operations:
+            operations = [op for op in operations if operation.lower() in op.lower()]
+        else:
+            operations = [operation]
         
-        cursor.execute(
-            "INSERT INTO events (timestamp, event_type, component, event_id, data) VALUES (?, ?, ?, ?, ?)",
-            (event.timestamp, event.event_type, event.component, event.event_id, json.dumps(event.data))
-        )
+        histogram = LatencyHistogram()
+        for op in operations:
+            histogram.merge(self.latency.get(op, window))
         
-        conn.commit()
-        conn.close()
+        return {
+            'operation': operation,
+            'count': histogram.count,
+            'p50': round(histogram.percentile(50), 2),
+            'p90': round(histogram.percentile(90), 2),
+            'p99': round(histogram.percentile(99), 2),
+            'max': round(histogram.max_ms, 2)
+        }
     
-    def _update_dashboard(self, event: TelemetryEvent):
-        """Update real-time dashboard"""
-        dashboard_path = "telemetry/dashboard.json"
-        dashboard = {}
-        
-        if os.path.exists(dashboard_path):
-            with open(dashboard_path, 'r') as f:
-                dashboard = json.load(f)
-        
-        # Update event counters
-        if 'event_counts' not in dashboard:
-            dashboard['event_counts'] = {}
-        
-        if event.event_type not in dashboard['event_counts']:
-            dashboard['event_counts'][event.event_type] = 0
-        dashboard['event_counts'][event.event_type] += 1
-        
-        # Update component activity
-        if 'component_activity' not in dashboard:
-            dashboard['component_activity'] = {}
+    def _store_event(self, event: TelemetryEvent):
+        """Queue event for the batched writer"""
+        self.event_queue.put(('events', (
+            event.timestamp, event.event_type, event.component, event.event_id,
+            json.dumps(event.data, default=str)
+        )))
+    
+    def capture_span(self, span: Span):
+        """Queue a finished span for the batched writer"""
+        self.event_queue.put(('spans', span.to_row()))
+    
+    def get_trace(self, trace_id: str) -> List[Dict]:
+        """Get all spans of a trace, in start order
         
-        if event.component not in dashboard['component_activity']:
-            dashboard['component_activity'][event.component] = []
+        In forwarder mode the spans are only complete if flush() could get the
+        aggregator's acknowledgement.
+        """
+        self.flush()
         
-        dashboard['component_activity'][event.component].append({
-            'timestamp': event.timestamp,
-            'event_type': event.event_type
-        })
+        cursor = self.store.connection().cursor()
+        cursor.row_factory = sqlite3.Row
+        try:
+            cursor.execute("SELECT * FROM spans WHERE trace_id = ? ORDER BY start_time, id", (trace_id,))
+        except sqlite3.OperationalError:
+            # Worker without an aggregator yet: the schema doesn't exist
+            return []
+        spans = [dict(row) for row in cursor.fetchall()]
         
-        # Keep only last 100 events per component
-        if len(dashboard['component_activity'][event.component]) > 100:
-            dashboard['component_activity'][event.component] = dashboard['component_activity'][event.component][-100:]
+        return spans
+    
+    def get_sampling_stats(self) -> Dict:
+        """Get kept/dropped/truncated event counts"""
+        return self.sampler.get_stats()
+    
+    def get_recent_events(self, limit: int = 10, component: str = None,
+                          event_type: str = None) -> List[Dict]:
+        """Get last N events from memory without going to SQLite"""
+        return [event.to_dict() for event in self.events.recent(limit, component, event_type)]
+    
+    def start_metrics_server(self, port: int = 9464, host: str = '127.0.0.1'):
+        """Serve counters, gauges and latency histograms in OpenMetrics format"""
+        if self.exporter is None:
+            self.exporter = OpenMetricsExporter(self, host, port)
+            address = self.exporter.start()
+            print(f"📈 Telemetry metrics: http://{address[0]}:{address[1]}/metrics")
+        return self.exporter
+    
+    def _start_retention_schedule(self, interval_hours: float):
+        def scheduler():
+            while not self._retention_stop.wait(interval_hours * 3600):
+                try:
+                    self.run_retention()
+                except sqlite3.Error as e:
+                    print(f"Telemetry retention error: {e}")
         
-        # Update system health
-        dashboard['last_update'] = event.timestamp
-        dashboard['uptime_seconds'] = (datetime.now() - self.start_time).total_seconds()
+        thread = threading.Thread(target=scheduler, name="telemetry-retention", daemon=True)
+        thread.start()
+    
+    def run_retention(self) -> Dict:
+        """Prune and downsample old telemetry, then reclaim space"""
+        self.flush()
+        stats = self.retention.run()
+        self.capture_event("telemetry_retention", "telemetry", stats)
+        return stats
+    
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Write all queued telemetry to the database
         
-        with open(dashboard_path, 'w') as f:
-            json.dump(dashboard, f, indent=2)
+        In forwarder mode True means the aggregator acknowledged committing
+        everything sent so far; False if it is unreachable or its write failed.
+        """
+        return self.writer.flush(timeout)
+    
+    def close(self):
+        """Flush queued telemetry and stop the writer"""
+        self._retention_stop.set()
+        if self.exporter is not None:
+            self.exporter.stop()
+        self.writer.close()
+        self.dashboard.close()
+        self.events.close()
+    
+    def _update_dashboard(self, event: TelemetryEvent):
+        """Update real-time dashboard"""
+        self.dashboard.record(event)
     
     def get_system_health(self) -> Dict:
         """Get system health summary"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.store.connection()
         cursor = conn.cursor()
         
-        # Get recent events
-        cursor.execute("SELECT COUNT(*) FROM events WHERE timestamp > datetime('now', '-1 hour')")
-        hourly_events = cursor.fetchone()[0]
+        # Rollups are keyed by local ISO minute, same as the raw timestamps
+        since = (datetime.now() - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
         
-        # Get success rate
-        cursor.execute("SELECT AVG(success) FROM performance WHERE timestamp > datetime('now', '-1 hour')")
-        success_rate = cursor.fetchone()[0] or 0
-        
-        # Get average performance
-        cursor.execute("SELECT AVG(duration_ms) FROM performance WHERE timestamp > datetime('now', '-1 hour')")
-        avg_duration = cursor.fetchone()[0] or 0
-        
-        conn.close()
+        try:
+            # Get recent events
+            cursor.execute("SELECT SUM(count) FROM event_rollup_minute WHERE minute >= ?", (since,))
+            hourly_events = cursor.fetchone()[0] or 0
+            
+            # Get success rate and average performance
+            cursor.execute(
+                "SELECT SUM(success_count), SUM(sum_ms), SUM(count) FROM perf_rollup_minute WHERE minute >= ?",
+                (since,)
+            )
+            successes, total_ms, calls = cursor.fetchone()
+        except sqlite3.OperationalError:
+            # A worker started before any aggregator created the schema: nothing recorded yet
+            hourly_events, successes, total_ms, calls = 0, 0, 0, 0
+        success_rate = successes / calls if calls else 0
+        avg_duration = total_ms / calls if calls else 0
         
         return {
             'hourly_events': hourly_events,
@@ -234,7 +1891,13 @@ class TelemetryCollector:
         }
     
     def get_content_quality_score(self) -> Dict:
-        """Calculate content quality score based on telemetry"""
+        """Calculate content quality score based on telemetry (TTL-cached)"""
+        with self._score_lock:
+            cached = self._quality_cache
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
+        # One pass over in-memory state, no SQLite
         scores = {
             'gemini_latency': self._calculate_latency_score(),
             'wordpress_success': self._calculate_wordpress_score(),
@@ -244,82 +1907,76 @@ class TelemetryCollector:
         
         overall_score = statistics.mean(scores.values()) if scores else 0
         
-        return {
+        result = {
             'overall_score': round(overall_score, 2),
             'component_scores': scores,
             'assessment': self._get_quality_assessment(overall_score)
         }
+        
+        with self._score_lock:
+            self._quality_cache = (time.monotonic() + self.quality_cache_ttl, result)
+        
+        return result
     
     def _calculate_latency_score(self) -> float:
-        """Calculate Gemini latency score (lower is better)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Calculate Gemini latency score from tail latency (lower is better)"""
+        latency = self.get_latency_percentiles('gemini', window=24 * 60)
         
-        cursor.execute(
-            "SELECT AVG(duration_ms) FROM performance WHERE operation LIKE '%gemini%'"
-        )
-        avg_latency = cursor.fetchone()[0] or 1000
-        
-        conn.close()
+        # Averages hide the slow tail that breaks the schedule, so score on p90
+        p90_latency = latency['p90'] if latency['count'] else 1000
         
         # Score: <500ms = 100%, <1000ms = 80%, <2000ms = 60%, >2000ms = 40%
-        if avg_latency < 500:
+        if p90_latency < 500:
             return 1.0
-        elif avg_latency < 1000:
+        elif p90_latency < 1000:
             return 0.8
-        elif avg_latency < 2000:
+        elif p90_latency < 2000:
             return 0.6
         else:
             return 0.4
     
     def _calculate_wordpress_score(self) -> float:
         """Calculate WordPress success score"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        calls = 0
+        successes = 0
         
-        cursor.execute(
-            "SELECT AVG(success) FROM performance WHERE operation LIKE '%wordpress%'"
-        )
-        success_rate = cursor.fetchone()[0] or 0
+        with self._score_lock:
+            for operation, (count, success_count) in self._operation_totals.items():
+                if 'wordpress' in operation.lower():
+                    calls += count
+                    successes += success_count
         
-        conn.close()
-        
-        return success_rate
+        return successes / calls if calls else 0
     
     def _calculate_topic_score(self) -> float:
         """Calculate topic effectiveness score"""
         # This would use topic_performance.json from Content Intelligence Memory
         topic_file = "memory/topic_performance.json"
-        if os.path.exists(topic_file):
-            with open(topic_file, 'r') as f:
-                topics = json.load(f)
-            
-            if topics:
-                avg_performance = statistics.mean(t.get('performance_score', 0) for t in topics[-10:])
-                return min(avg_performance, 1.0)
+        try:
+            mtime = os.path.getmtime(topic_file)
+        except OSError:
+            return 0.7  # Default
         
-        return 0.7  # Default
-    
-    def _calculate_length_score(self) -> float:
-        """Calculate content length score"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Re-read only when the file changed
+        cached_mtime, cached_score = self._topic_score_cache
+        if cached_mtime == mtime:
+            return cached_score
         
-        cursor.execute(
-            "SELECT data FROM events WHERE event_type = 'article_generated' ORDER BY timestamp DESC LIMIT 10"
-        )
-        recent_articles = cursor.fetchall()
+        score = 0.7
+        with open(topic_file, 'r') as f:
+            topics = json.load(f)
         
-        conn.close()
+        if topics:
+            avg_performance = statistics.mean(t.get('performance_score', 0) for t in topics[-10:])
+            score = min(avg_performance, 1.0)
         
-        word_counts = []
-        for article_data in recent_articles:
-            try:
-                data = json.loads(article_data[0])
-                if 'word_count' in data:
-                    word_counts.append(data['word_count'])
-            except:
-                continue
+        self._topic_score_cache = (mtime, score)
+        return score
+    
+    def _calculate_length_score(self) -> float:
+        """Calculate content length score"""
+        with self._score_lock:
+            word_counts = list(self._recent_word_counts)
         
         if not word_counts:
             return 0.7
@@ -361,58 +2018,142 @@ class EventListener:
         pass
     
     def listen_to_function(self, func, operation_name: str):
-        """Decorator to listen to function execution"""
-        def wrapper(*args, **kwargs):
-            start_time = time.time()
-            
-            try:
-                result = func(*args, **kwargs)
-                success = True
-            except Exception as e:
-                success = False
-                result = None
+        """Decorator to listen to function execution (def or async def)"""
+        tracer = self.telemetry.tracer
+        
+        def record(span: Span, error: Exception = None):
+            self.telemetry.capture_performance(operation_name, span.duration_ms, error is None)
+            if error is not None:
                 self.telemetry.capture_event(
                     "function_error",
                     operation_name,
-                    {"error": str(e), "args": str(args)[:100]}
+                    {"error": str(error), "trace_id": span.trace_id}
                 )
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                error = None
+                result = None
+                with tracer.span(operation_name) as span:
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        error = e
+                        span.success = False
+                        span.error = str(e)[:200]
+                record(span, error)
+                return result
             
-            duration_ms = (time.time() - start_time) * 1000
-            
-            self.telemetry.capture_performance(operation_name, duration_ms, success)
-            self.telemetry.capture_event(
-                "function_executed",
-                operation_name,
-                {
-                    "duration_ms": round(duration_ms, 2),
-                    "success": success,
-                    "timestamp": datetime.now().isoformat()
-                }
-            )
-            
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            error = None
+            result = None
+            with tracer.span(operation_name) as span:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                    span.success = False
+                    span.error = str(e)[:200]
+            record(span, error)
             return result
         
         return wrapper
 
 # =================== CONTENT INTELLIGENCE MEMORY ===================
 
+_MISSING = object()
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL and hit/miss counters"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+        }
+
 class ContentMemory:
     """Self-learning memory system for content intelligence"""
     
-    def __init__(self):
+    def __init__(self, config: Dict = None, telemetry: 'TelemetryCollector' = None):
+        self.config = config or {}
         self.memory_dir = "memory"
         os.makedirs(self.memory_dir, exist_ok=True)
         
         self.db_path = f"{self.memory_dir}/content_memory.db"
+        self.store = get_store(self.db_path)
         self._init_database()
         
-        # In-memory cache for performance
-        self.topic_cache = {}
-        self.keyword_cache = {}
+        # In-memory cache for performance: topic_cache maps lookup term -> matched
+        # pattern row (None when nothing matches), keyword_cache maps keyword -> stats
+        cache_size = self.config.get('cache_size', 4096)
+        cache_ttl = self.config.get('cache_ttl', 300)
+        self.topic_cache = TTLCache(cache_size, cache_ttl)
+        self.keyword_cache = TTLCache(cache_size, cache_ttl)
+        self.best_topics_cache = TTLCache(16, cache_ttl)
+        
+        if telemetry:
+            telemetry.register_cache('memory_topics', self.topic_cache)
+            telemetry.register_cache('memory_keywords', self.keyword_cache)
+            telemetry.register_cache('memory_best_topics', self.best_topics_cache)
+        
+        # Daemon modes pre-warm so the first lookups don't all miss
+        if self.config.get('prewarm_cache'):
+            self.warm_cache()
     
     def _init_database(self):
         """Initialize content memory database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.store.connection()
         cursor = conn.cursor()
         
         # Articles table
@@ -459,114 +2200,214 @@ class ContentMemory:
             )
         ''')
         
-        conn.commit()
-        conn.close()
-    
-    def store_article(self, article_data: Dict):
-        """Store article in memory"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO articles 
-                (title, slug, content_hash, word_count, focus_keyword, categories, generated_at, published)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                article_data.get('title', ''),
-                article_data.get('slug', ''),
-                article_data.get('hash', ''),
-                article_data.get('word_count', 0),
-                article_data.get('focus_keyword', ''),
-                json.dumps(article_data.get('categories', [])),
-                datetime.now().isoformat(),
-                0  # Not published yet
-            ))
-            
-            # Update topic performance
-            self._update_topic_performance(article_data.get('title', ''))
-            
-            # Update SEO history
-            if article_data.get('focus_keyword'):
-                self._update_seo_history(article_data.get('focus_keyword'))
-            
-            conn.commit()
-            
-        except Exception as e:
-            print(f"Memory storage error: {e}")
-        
-        finally:
-            conn.close()
-    
-    def _update_topic_performance(self, title: str):
-        """Update topic performance based on article title"""
-        # Extract topic patterns from title
-        words = title.lower().split()
-        patterns = []
-        
-        # Create patterns of 2-3 word combinations
-        for i in range(len(words) - 1):
-            patterns.append(' '.join(words[i:i+2]))
-        
-        for i in range(len(words) - 2):
-            patterns.append(' '.join(words[i:i+3]))
+        # Unique keys for the upserts in store_article
+        self._ensure_unique_index(cursor, 'topic_performance', 'topic_pattern', 'total_articles', 'last_used',
+                                  ('avg_word_count', 'avg_performance', 'avg_revenue', 'success_rate'))
+        self._ensure_unique_index(cursor, 'seo_history', 'keyword', 'articles_count', 'last_updated',
+                                  ('avg_position', 'avg_ctr'))
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Inverted index: 2-3 word term -> topic_performance rows whose pattern contains it
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topic_terms (
+                term TEXT NOT NULL,
+                topic_id INTEGER NOT NULL,
+                PRIMARY KEY (term, topic_id)
+            ) WITHOUT ROWID
+        ''')
         
-        for pattern in patterns:
-            cursor.execute(
-                "SELECT * FROM topic_performance WHERE topic_pattern = ?",
-                (pattern,)
+        # Index patterns stored before topic_terms existed
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM topic_terms)")
+        if not cursor.fetchone()[0]:
+            cursor.execute("SELECT id, topic_pattern FROM topic_performance WHERE topic_pattern IS NOT NULL")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO topic_terms (term, topic_id) VALUES (?, ?)",
+                [(term, topic_id) for topic_id, pattern in cursor.fetchall() for term in self._pattern_terms(pattern)]
             )
-            
-            if cursor.fetchone():
-                cursor.execute('''
-                    UPDATE topic_performance 
-                    SET total_articles = total_articles + 1,
-                        last_used = ?
-                    WHERE topic_pattern = ?
-                ''', (datetime.now().isoformat(), pattern))
-            else:
-                cursor.execute('''
-                    INSERT INTO topic_performance 
-                    (topic_pattern, total_articles, last_used)
-                    VALUES (?, 1, ?)
-                ''', (pattern, datetime.now().isoformat()))
         
         conn.commit()
-        conn.close()
-    
-    def _update_seo_history(self, keyword: str):
-        """Update SEO history for keyword"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         
-        cursor.execute(
-            "SELECT * FROM seo_history WHERE keyword = ?",
-            (keyword,)
-        )
+        self._init_stats()
+    
+    # Full-table recount; what the trigger-maintained memory_stats rows must equal
+    STATS_RECOUNT = '''
+        SELECT 'articles', COUNT(*) FROM articles
+        UNION ALL SELECT 'topics', COUNT(*) FROM topic_performance
+        UNION ALL SELECT 'keywords', COUNT(*) FROM seo_history
+        UNION ALL SELECT 'word_count_sum', COALESCE(SUM(word_count), 0) FROM articles
+        UNION ALL SELECT 'word_count_rows', COUNT(word_count) FROM articles
+    '''
+    
+    STATS_TRIGGERS = {
+        'articles_stats_insert': '''
+            AFTER INSERT ON articles BEGIN
+                UPDATE memory_stats SET value = value + 1 WHERE name = 'articles';
+                UPDATE memory_stats SET value = value + COALESCE(NEW.word_count, 0) WHERE name = 'word_count_sum';
+                UPDATE memory_stats SET value = value + (NEW.word_count IS NOT NULL) WHERE name = 'word_count_rows';
+            END
+        ''',
+        'articles_stats_delete': '''
+            AFTER DELETE ON articles BEGIN
+                UPDATE memory_stats SET value = value - 1 WHERE name = 'articles';
+                UPDATE memory_stats SET value = value - COALESCE(OLD.word_count, 0) WHERE name = 'word_count_sum';
+                UPDATE memory_stats SET value = value - (OLD.word_count IS NOT NULL) WHERE name = 'word_count_rows';
+            END
+        ''',
+        'articles_stats_update': '''
+            AFTER UPDATE OF word_count ON articles BEGIN
+                UPDATE memory_stats SET value = value - COALESCE(OLD.word_count, 0) + COALESCE(NEW.word_count, 0)
+                WHERE name = 'word_count_sum';
+                UPDATE memory_stats SET value = value - (OLD.word_count IS NOT NULL) + (NEW.word_count IS NOT NULL)
+                WHERE name = 'word_count_rows';
+            END
+        ''',
+        'topics_stats_insert': "AFTER INSERT ON topic_performance BEGIN "
+                               "UPDATE memory_stats SET value = value + 1 WHERE name = 'topics'; END",
+        'topics_stats_delete': "AFTER DELETE ON topic_performance BEGIN "
+                               "UPDATE memory_stats SET value = value - 1 WHERE name = 'topics'; END",
+        'keywords_stats_insert': "AFTER INSERT ON seo_history BEGIN "
+                                 "UPDATE memory_stats SET value = value + 1 WHERE name = 'keywords'; END",
+        'keywords_stats_delete': "AFTER DELETE ON seo_history BEGIN "
+                                 "UPDATE memory_stats SET value = value - 1 WHERE name = 'keywords'; END"
+    }
+    
+    def _init_stats(self):
+        """Counters kept current by triggers, so stats reads never scan the big tables"""
+        with self.store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS memory_stats (
+                    name TEXT PRIMARY KEY,
+                    value REAL DEFAULT 0
+                )
+            ''')
+            
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+            missing = [name for name in self.STATS_TRIGGERS if f"trg_{name}" not in existing]
+            for name in missing:
+                conn.execute(f"CREATE TRIGGER trg_{name} {self.STATS_TRIGGERS[name]}")
+            
+            # New triggers only see future writes: seed the counters from the tables once
+            if missing:
+                conn.execute(f"INSERT OR REPLACE INTO memory_stats (name, value) {self.STATS_RECOUNT}")
+    
+    def check_stats(self, rebuild: bool = False) -> Dict:
+        """Compare the trigger-maintained counters with a full recount, optionally fixing them"""
+        with self.store.transaction() as conn:
+            stored = dict(conn.execute("SELECT name, value FROM memory_stats"))
+            actual = dict(conn.execute(self.STATS_RECOUNT))
+            mismatches = {
+                name: {'stored': stored.get(name), 'actual': value}
+                for name, value in actual.items() if stored.get(name) != value
+            }
+            if mismatches and rebuild:
+                conn.execute(f"INSERT OR REPLACE INTO memory_stats (name, value) {self.STATS_RECOUNT}")
         
+        return {'consistent': not mismatches, 'mismatches': mismatches, 'rebuilt': bool(mismatches and rebuild)}
+    
+    @staticmethod
+    def _ensure_unique_index(cursor: sqlite3.Cursor, table: str, key: str, count_column: str, time_column: str,
+                             avg_columns: Tuple[str, ...] = ()):
+        """Merge duplicate rows left by older versions, then add the unique index"""
+        index = f"idx_{table}_{key}"
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,))
         if cursor.fetchone():
-            cursor.execute('''
-                UPDATE seo_history 
-                SET articles_count = articles_count + 1,
-                    last_updated = ?
-                WHERE keyword = ?
-            ''', (datetime.now().isoformat(), keyword))
-        else:
-            cursor.execute('''
-                INSERT INTO seo_history 
-                (keyword, articles_count, last_updated)
-                VALUES (?, 1, ?)
-            ''', (keyword, datetime.now().isoformat()))
+            return
+        
+        # Fold counts into the oldest row of each duplicate group and drop the rest;
+        # averages are weighted by each row's count (plain mean if all counts are 0).
+        # Only one row per group is updated, so the subqueries see the original values.
+        group = f"FROM {table} d WHERE d.{key} IS {table}.{key}"
+        averages = ''.join(
+            f"{column} = (SELECT COALESCE(SUM(d.{column} * d.{count_column}) / NULLIF(SUM(d.{count_column}), 0), "
+            f"AVG(d.{column})) {group}),\n"
+            for column in avg_columns
+        )
+        cursor.execute(f'''
+            UPDATE {table} SET
+                {averages}
+                {count_column} = (SELECT SUM(d.{count_column}) {group}),
+                {time_column} = (SELECT MAX(d.{time_column}) {group})
+            WHERE id IN (SELECT MIN(id) FROM {table} GROUP BY {key} HAVING COUNT(*) > 1)
+        ''')
+        cursor.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key})")
+        cursor.execute(f"CREATE UNIQUE INDEX {index} ON {table}({key})")
+    
+    ARTICLE_UPSERT = '''
+        INSERT INTO articles 
+        (title, slug, content_hash, word_count, focus_keyword, categories, generated_at, published)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+        ON CONFLICT(slug) DO UPDATE SET
+            title = excluded.title,
+            content_hash = excluded.content_hash,
+            word_count = excluded.word_count,
+            focus_keyword = excluded.focus_keyword,
+            categories = excluded.categories,
+            generated_at = excluded.generated_at
+    '''
+    
+    TOPIC_UPSERT = '''
+        INSERT INTO topic_performance (topic_pattern, total_articles, last_used)
+        VALUES (?, 1, ?)
+        ON CONFLICT(topic_pattern) DO UPDATE SET
+            total_articles = total_articles + 1,
+            last_used = excluded.last_used
+    '''
+    
+    SEO_UPSERT = '''
+        INSERT INTO seo_history (keyword, articles_count, last_updated)
+        VALUES (?, 1, ?)
+        ON CONFLICT(keyword) DO UPDATE SET
+            articles_count = articles_count + 1,
+            last_updated = excluded.last_updated
+    '''
+    
+    TOPIC_TERM_INSERT = '''
+        INSERT OR IGNORE INTO topic_terms (term, topic_id)
+        SELECT ?, id FROM topic_performance WHERE topic_pattern = ?
+    '''
+    
+    # Bound on SQL variables per IN (...) lookup
+    LOOKUP_CHUNK = 500
+    
+    def store_article(self, article_data: Dict):
+        """Store article in memory (one transaction)"""
+        now = datetime.now().isoformat()
         
-        conn.commit()
-        conn.close()
+        try:
+            with self.store.transaction() as conn:
+                cursor = conn.cursor()
+                
+                # Upsert keeps the row id (and published/performance data) of a re-generated slug
+                cursor.execute(self.ARTICLE_UPSERT, (
+                    article_data.get('title', ''),
+                    article_data.get('slug', ''),
+                    article_data.get('hash', ''),
+                    article_data.get('word_count', 0),
+                    article_data.get('focus_keyword', ''),
+                    json.dumps(article_data.get('categories', [])),
+                    now
+                ))
+                
+                # Update topic performance
+                self._update_topic_performance(cursor, article_data.get('title', ''), now)
+                
+                # Update SEO history
+                if article_data.get('focus_keyword'):
+                    self._update_seo_history(cursor, article_data.get('focus_keyword'), now)
+            
+            # Only the terms whose matched row may have changed
+            patterns = set(self._topic_patterns(article_data.get('title', '')))
+            self.topic_cache.invalidate(*{term for pattern in patterns for term in self._pattern_terms(pattern)})
+            if article_data.get('focus_keyword'):
+                self.keyword_cache.invalidate(article_data.get('focus_keyword'))
+            self.best_topics_cache.clear()
+            
+        except Exception as e:
+            print(f"Memory storage error: {e}")
     
-    def get_topic_performance(self, topic: str) -> Dict:
-        """Get performance data for a topic"""
-        words = topic.lower().split()
+    @staticmethod
+    def _topic_patterns(text: str) -> List[str]:
+        """2- and 3-word combinations of a title"""
+        words = text.lower().split()
         patterns = []
         
         for i in range(len(words) - 1):
@@ -575,27 +2416,123 @@ class ContentMemory:
         for i in range(len(words) - 2):
             patterns.append(' '.join(words[i:i+3]))
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        return patterns
+    
+    @staticmethod
+    def _pattern_terms(pattern: str) -> List[str]:
+        """Lookup terms a stored pattern answers to: itself and its 2-word sub-patterns"""
+        words = pattern.split()
+        terms = [pattern]
+        if len(words) == 3:
+            terms.extend([' '.join(words[:2]), ' '.join(words[1:])])
+        return terms
+    
+    def _update_topic_performance(self, cursor: sqlite3.Cursor, title: str, now: str):
+        """Update topic performance based on article title, in the caller's transaction"""
+        patterns = self._topic_patterns(title)
+        cursor.executemany(self.TOPIC_UPSERT, [(pattern, now) for pattern in patterns])
+        
+        # Keep the inverted index in step (no-op for patterns already indexed)
+        cursor.executemany(
+            self.TOPIC_TERM_INSERT,
+            [(term, pattern) for pattern in set(patterns) for term in self._pattern_terms(pattern)]
+        )
+    
+    def _update_seo_history(self, cursor: sqlite3.Cursor, keyword: str, now: str):
+        """Update SEO history for keyword, in the caller's transaction"""
+        cursor.execute(self.SEO_UPSERT, (keyword, now))
+    
+    def get_topic_performance(self, topic: str) -> Dict:
+        """Get performance data for a topic"""
+        return self.get_topic_performance_many([topic])[topic]
+    
+    def get_topic_performance_many(self, titles: List[str]) -> Dict[str, Dict]:
+        """Get performance data for many candidate topics with one indexed lookup per chunk"""
+        title_patterns = {title: self._topic_patterns(title) for title in titles}
+        
+        matches = {}
+        missing = []
+        for term in {pattern for patterns in title_patterns.values() for pattern in patterns}:
+            cached = self.topic_cache.get(term)
+            if cached is _MISSING:
+                missing.append(term)
+            else:
+                matches[term] = cached
         
-        performance_data = []
-        for pattern in patterns:
-            cursor.execute(
-                "SELECT * FROM topic_performance WHERE topic_pattern LIKE ?",
-                (f'%{pattern}%',)
-            )
+        if missing:
+            found = self._lookup_terms(self.store.connection().cursor(), missing)
             
-            row = cursor.fetchone()
-            if row:
-                performance_data.append({
-                    'pattern': row[1],
-                    'total_articles': row[2],
-                    'avg_performance': row[4],
-                    'last_used': row[6]
-                })
+            for term in missing:
+                matches[term] = found.get(term)
+                self.topic_cache.put(term, matches[term])
+        
+        return {
+            title: self._summarize_topic_performance([matches[p] for p in patterns if matches[p]])
+            for title, patterns in title_patterns.items()
+        }
+    
+    def _lookup_terms(self, cursor: sqlite3.Cursor, terms: List[str]) -> Dict[str, Dict]:
+        """Resolve lookup terms to pattern rows through the topic_terms index"""
+        # Per term: the exact pattern if stored, else the oldest pattern containing it
+        matches = {}
+        for start in range(0, len(terms), self.LOOKUP_CHUNK):
+            chunk = terms[start:start + self.LOOKUP_CHUNK]
+            cursor.execute(f'''
+                SELECT m.term, p.topic_pattern, p.total_articles, p.avg_performance, p.last_used
+                FROM (
+                    SELECT term, MIN(topic_id) AS topic_id FROM topic_terms
+                    WHERE term IN ({','.join('?' * len(chunk))})
+                    GROUP BY term
+                ) m
+                LEFT JOIN topic_performance e ON e.topic_pattern = m.term
+                JOIN topic_performance p ON p.id = COALESCE(e.id, m.topic_id)
+            ''', chunk)
+            
+            for term, pattern, total_articles, avg_performance, last_used in cursor.fetchall():
+                matches[term] = {
+                    'pattern': pattern,
+                    'total_articles': total_articles,
+                    'avg_performance': avg_performance,
+                    'last_used': last_used
+                }
+        
+        return matches
+    
+    def warm_cache(self) -> Dict:
+        """Load the most recently used topics and keywords into the caches"""
+        conn = self.store.connection()
+        cursor = conn.cursor()
         
-        conn.close()
+        cursor.execute(
+            "SELECT topic_pattern FROM topic_performance WHERE topic_pattern IS NOT NULL "
+            "ORDER BY last_used DESC LIMIT ?",
+            (self.topic_cache.maxsize,)
+        )
+        terms = list({term for (pattern,) in cursor.fetchall() for term in self._pattern_terms(pattern)})
+        terms = terms[:self.topic_cache.maxsize]
+        found = self._lookup_terms(cursor, terms)
+        for term in terms:
+            self.topic_cache.put(term, found.get(term))
+        
+        cursor.execute(
+            "SELECT keyword, articles_count, avg_position, avg_ctr, last_updated FROM seo_history "
+            "ORDER BY last_updated DESC LIMIT ?",
+            (self.keyword_cache.maxsize,)
+        )
+        for row in cursor.fetchall():
+            self.keyword_cache.put(row[0], self._keyword_stats(row))
         
+        return {'topics': len(self.topic_cache), 'keywords': len(self.keyword_cache)}
+    
+    def get_cache_stats(self) -> Dict:
+        return {
+            'topics': self.topic_cache.get_stats(),
+            'keywords': self.keyword_cache.get_stats(),
+            'best_topics': self.best_topics_cache.get_stats()
+        }
+    
+    @staticmethod
+    def _summarize_topic_performance(performance_data: List[Dict]) -> Dict:
         if performance_data:
             avg_performance = statistics.mean([p['avg_performance'] for p in performance_data])
             total_articles = sum([p['total_articles'] for p in performance_data])
@@ -611,7 +2548,11 @@ class ContentMemory:
     
     def get_best_topics(self, limit: int = 5) -> List[Dict]:
         """Get best performing topics"""
-        conn = sqlite3.connect(self.db_path)
+        cached = self.best_topics_cache.get(limit)
+        if cached is not _MISSING:
+            return [dict(topic) for topic in cached]
+        
+        conn = self.store.connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -632,37 +2573,47 @@ class ContentMemory:
                 'recommendation': self._get_topic_recommendation(row[1] or 0, row[2])
             })
         
-        conn.close()
-        return topics
+        self.best_topics_cache.put(limit, topics)
+        return [dict(topic) for topic in topics]
     
     def get_keyword_performance(self, keyword: str) -> Dict:
         """Get performance data for a keyword"""
-        conn = sqlite3.connect(self.db_path)
+        cached = self.keyword_cache.get(keyword)
+        if cached is not _MISSING:
+            return dict(cached)
+        
+        conn = self.store.connection()
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT * FROM seo_history WHERE keyword = ?",
+            "SELECT keyword, articles_count, avg_position, avg_ctr, last_updated FROM seo_history WHERE keyword = ?",
             (keyword,)
         )
         
         row = cursor.fetchone()
-        conn.close()
         
         if row:
-            return {
-                'keyword': row[1],
-                'articles_count': row[2],
-                'avg_position': row[3] or 50,  # Default position if unknown
-                'avg_ctr': row[4] or 0.02,     # Default CTR
-                'last_updated': row[5]
+            stats = self._keyword_stats(row)
+        else:
+            stats = {
+                'keyword': keyword,
+                'articles_count': 0,
+                'avg_position': 100,  # Low position for new keywords
+                'avg_ctr': 0.01,
+                'last_updated': None
             }
         
+        self.keyword_cache.put(keyword, stats)
+        return dict(stats)
+    
+    @staticmethod
+    def _keyword_stats(row) -> Dict:
         return {
-            'keyword': keyword,
-            'articles_count': 0,
-            'avg_position': 100,  # Low position for new keywords
-            'avg_ctr': 0.01,
-            'last_updated': None
+            'keyword': row[0],
+            'articles_count': row[1],
+            'avg_position': row[2] or 50,  # Default position if unknown
+            'avg_ctr': row[3] or 0.02,     # Default CTR
+            'last_updated': row[4]
         }
     
     def _get_topic_recommendation(self, performance: float, articles: int) -> str:
@@ -676,8 +2627,18 @@ class ContentMemory:
         else:
             return "AVERAGE - Consider alternatives"
     
-    def export_memory_report(self) -> str:
-        """Export memory report"""
+    EXPORT_TABLES = ('articles', 'topic_performance', 'seo_history')
+    
+    def export_memory_report(self, format: str = 'summary', tables: List[str] = None,
+                             compress: bool = False, batch_size: int = 5000) -> str:
+        """Export memory report
+        
+        'summary' (default) writes the small JSON report. 'jsonl' and 'csv'
+        stream whole tables, one file per table, and return the export directory.
+        """
+        if format != 'summary':
+            return self._export_tables(format, tables or self.EXPORT_TABLES, compress, batch_size)
+        
         report = {
             'timestamp': datetime.now().isoformat(),
             'total_articles': self._count_articles(),
@@ -692,36 +2653,58 @@ class ContentMemory:
         
         return report_path
     
+    def _export_tables(self, format: str, tables: List[str], compress: bool, batch_size: int) -> str:
+        """Stream tables to JSONL/CSV with fetchmany, from one read snapshot"""
+        if format not in ('jsonl', 'csv'):
+            raise ValueError(f"Unknown export format: {format}")
+        unknown = set(tables) - set(self.EXPORT_TABLES)
+        if unknown:
+            raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+        
+        export_dir = f"{self.memory_dir}/export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        os.makedirs(export_dir, exist_ok=True)
+        
+        # A deferred transaction gives every table the same snapshot without blocking writers (WAL)
+        with self.store.transaction(immediate=False) as conn:
+            for table in tables:
+                path = f"{export_dir}/{table}.{format}" + ('.gz' if compress else '')
+                opener = gzip.open if compress else open
+                
+                cursor = conn.execute(f"SELECT * FROM {table} ORDER BY rowid")
+                columns = [column[0] for column in cursor.description]
+                
+                with opener(path, 'wt', encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f) if format == 'csv' else None
+                    if writer:
+                        writer.writerow(columns)
+                    
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        if writer:
+                            writer.writerows(rows)
+                        else:
+                            f.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+        
+        return export_dir
+    
+    def _read_stats(self) -> Dict[str, float]:
+        return dict(self.store.connection().execute("SELECT name, value FROM memory_stats"))
+    
     def _count_articles(self) -> int:
         """Count total articles in memory"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM articles")
-        count = cursor.fetchone()[0]
-        
-        conn.close()
-        return count
+        return int(self._read_stats().get('articles', 0))
     
     def _get_system_stats(self) -> Dict:
         """Get system statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM topic_performance")
-        topic_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM seo_history")
-        keyword_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT AVG(word_count) FROM articles")
-        avg_word_count = cursor.fetchone()[0] or 0
-        
-        conn.close()
+        stats = self._read_stats()
+        rows = stats.get('word_count_rows', 0)
+        avg_word_count = stats.get('word_count_sum', 0) / rows if rows else 0
         
         return {
-            'total_topics': topic_count,
-            'total_keywords': keyword_count,
+            'total_topics': int(stats.get('topics', 0)),
+            'total_keywords': int(stats.get('keywords', 0)),
             'avg_word_count': round(avg_word_count, 2),
             'database_size_mb': round(os.path.getsize(self.db_path) / (1024 * 1024), 2)
         }
@@ -731,7 +2714,7 @@ class ContentMemory:
         recommendations = []
         
         # Check for underperforming topics
-        conn = sqlite3.connect(self.db_path)
+        conn = self.store.connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -748,8 +2731,6 @@ class ContentMemory:
                 f"Avoid topic pattern '{topic[0]}' - low performance ({topic[1]:.2f}) across {topic[2]} articles"
             )
         
-        conn.close()
-        
         # Check for overused keywords
         if len(recommendations) < 5:
             recommendations.append("Consider diversifying keyword usage for better SEO")
@@ -759,6 +2740,217 @@ class ContentMemory:
         
         return recommendations[:5]  # Return top 5
 
+def extract_article_file(path: str) -> Optional[Dict]:
+    """Title, content, word count and hash of a saved article (.html, .md or .txt)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    
+    if path.endswith('.html'):
+        title_match = re.search(r'<title>(.*?)</title>', content, re.S)
+    elif path.endswith('.md'):
+        title_match = re.search(r'^#\s+(.+)$', content, re.M)
+    else:
+        # Final_maker text backups start with "ARTICLE: <title>"
+        title_match = re.search(r'^ARTICLE:\s*(.+)$', content, re.M)
+    title = title_match.group(1).strip() if title_match else "Unknown Title"
+    
+    return {
+        'title': title,
+        'content': content,
+        'word_count': len(content.split()),
+        'hash': hashlib.md5(content.encode()).hexdigest()[:12]
+    }
+
+class MemoryBackfill:
+    """Stream historical outputs into ContentMemory
+    
+    Files are read and parsed by a bounded worker pool (never more than a
+    few batches in flight) and inserted in large transactions. Every source
+    is checkpointed in backfill_sources in the same transaction as its rows,
+    so an interrupted run resumes where it stopped. Articles whose content
+    hash is already known are skipped, so re-runs are idempotent.
+    """
+    
+    ARTICLE_INSERT = '''
+        INSERT INTO articles 
+        (title, slug, content_hash, word_count, focus_keyword, categories, generated_at, published)
+        SELECT ?, ?, ?, ?, '', '[]', ?, 0
+        WHERE NOT EXISTS (SELECT 1 FROM articles WHERE content_hash = ?)
+        ON CONFLICT(slug) DO NOTHING
+    '''
+    
+    ARTICLE_EXTENSIONS = ('.html', '.md', '.txt')
+    
+    def __init__(self, memory: ContentMemory, workers: int = 4, batch_size: int = 1000):
+        self.memory = memory
+        self.store = memory.store
+        self.workers = workers
+        self.batch_size = batch_size
+        self.stats = {'scanned': 0, 'skipped_sources': 0, 'imported': 0, 'duplicates': 0, 'errors': 0}
+        
+        with self.store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS backfill_sources (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL,
+                    position INTEGER DEFAULT 0,
+                    imported_at TEXT
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_content_hash ON articles (content_hash)")
+    
+    @staticmethod
+    def _slugify(title: str) -> str:
+        return re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')[:120]
+    
+    def _iter_article_files(self, directory: str, prefix: str = ''):
+        """Yield article files one directory entry at a time"""
+        if not os.path.isdir(directory):
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if (entry.is_file() and entry.name.startswith(prefix)
+                        and entry.name.endswith(self.ARTICLE_EXTENSIONS)):
+                    yield entry.path, entry.stat().st_mtime
+    
+    def _is_done(self, conn: sqlite3.Connection, path: str, mtime: float) -> bool:
+        row = conn.execute("SELECT mtime FROM backfill_sources WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == mtime
+    
+    def _extract(self, path: str, mtime: float) -> Dict:
+        try:
+            article = extract_article_file(path)
+        except OSError as e:
+            print(f"Backfill read error {path}: {e}")
+            return {'path': path, 'mtime': mtime, 'error': True}
+        
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return {
+            'path': path,
+            'mtime': mtime,
+            'title': article['title'],
+            # v5 names output files by slug; Final_maker backups share a slug across formats
+            'slug': stem if not stem.startswith('article_') else self._slugify(article['title']),
+            'word_count': article['word_count'],
+            'hash': article['hash'],
+            'generated_at': datetime.fromtimestamp(mtime).isoformat()
+        }
+    
+    def _write_batch(self, records: List[Dict], sources: List[tuple]):
+        """Insert new articles, fold their titles into topic stats and checkpoint the sources"""
+        now = datetime.now().isoformat()
+        with self.store.transaction() as conn:
+            cursor = conn.cursor()
+            for record in records:
+                cursor.execute(self.ARTICLE_INSERT, (
+                    record['title'], record['slug'] or f"backfill-{record['hash']}", record['hash'],
+                    record['word_count'], record['generated_at'], record['hash']
+                ))
+                if cursor.rowcount == 1:
+                    self.memory._update_topic_performance(cursor, record['title'], record['generated_at'])
+                    self.stats['imported'] += 1
+                else:
+                    self.stats['duplicates'] += 1
+            
+            cursor.executemany(
+                "INSERT OR REPLACE INTO backfill_sources (path, mtime, position, imported_at) VALUES (?, ?, ?, ?)",
+                [(path, mtime, position, now) for path, mtime, position in sources]
+            )
+    
+    def import_files(self, files) -> None:
+        """Import (path, mtime) pairs through the worker pool, in bounded windows"""
+        conn = self.store.connection()
+        window = self.workers * 4
+        records, sources = [], []
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = deque()
+            
+            def drain(limit: int):
+                while len(in_flight) > limit:
+                    record = in_flight.popleft().result()
+                    sources.append((record['path'], record['mtime'], 0))
+                    if record.get('error'):
+                        self.stats['errors'] += 1
+                    else:
+                        records.append(record)
+                    if len(sources) >= self.batch_size:
+                        self._write_batch(records, sources)
+                        records.clear()
+                        sources.clear()
+            
+            for path, mtime in files:
+                self.stats['scanned'] += 1
+                if self._is_done(conn, path, mtime):
+                    self.stats['skipped_sources'] += 1
+                    continue
+                in_flight.append(executor.submit(self._extract, path, mtime))
+                drain(window)
+            drain(0)
+        
+        if sources:
+            self._write_batch(records, sources)
+    
+    def import_automation_log(self, path: str = 'automation_log.json'):
+        """Import Final_maker's JSON-lines log, resuming from the last committed byte offset"""
+        if not os.path.exists(path):
+            return
+        
+        row = self.store.connection().execute(
+            "SELECT position FROM backfill_sources WHERE path = ?", (path,)
+        ).fetchone()
+        position = row[0] if row else 0
+        mtime = os.path.getmtime(path)
+        if position > os.path.getsize(path):
+            # Log was rotated or truncated since the last run
+            position = 0
+        
+        records = []
+        with open(path, 'rb') as f:
+            f.seek(position)
+            for line in f:
+                position += len(line)
+                self.stats['scanned'] += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    self.stats['errors'] += 1
+                    continue
+                
+                title = entry.get('topic') or 'Unknown Title'
+                # Log lines carry no article body: the entry itself is the identity
+                content_hash = hashlib.md5(f"{title}|{entry.get('timestamp', '')}".encode()).hexdigest()[:12]
+                records.append({
+                    'title': title,
+                    'slug': f"{self._slugify(title)}-{content_hash}",
+                    'word_count': entry.get('word_count', 0),
+                    'hash': content_hash,
+                    'generated_at': entry.get('timestamp') or datetime.fromtimestamp(mtime).isoformat()
+                })
+                
+                if len(records) >= self.batch_size:
+                    self._write_batch(records, [(path, mtime, position)])
+                    records = []
+        
+        self._write_batch(records, [(path, mtime, position)])
+    
+    def run(self, output_dir: str = 'output', backup_dir: str = '.',
+            log_path: str = 'automation_log.json') -> Dict:
+        """Backfill v5 output/*.html, Final_maker article_* backups and automation_log.json"""
+        started = time.time()
+        
+        self.import_files(self._iter_article_files(output_dir))
+        if os.path.abspath(backup_dir) != os.path.abspath(output_dir):
+            self.import_files(self._iter_article_files(backup_dir, prefix='article_'))
+        self.import_automation_log(log_path)
+        
+        # New rows touched topic stats behind the caches' back
+        self.memory.topic_cache.clear()
+        self.memory.best_topics_cache.clear()
+        
+        self.stats['duration_seconds'] = round(time.time() - started, 2)
+        return self.stats
+
 # =================== HUMAN OVERRIDE SWITCH ===================
 
 class HumanOverrideSwitch:
@@ -1296,27 +3488,163 @@ class DryRunSimulator:
 class SafetyGuardrail:
     """AI content validation and safety checking"""
     
-    def __init__(self):
+    def __init__(self, result_cache: ResultCache = None):
         self.safety_dir = "safety"
         os.makedirs(self.safety_dir, exist_ok=True)
         
-        # Load safety rules
-        self.rules = self._load_safety_rules()
+        # Load safety rules, compiled into an immutable rule set that is swapped
+        # whole when safety_rules.json changes
+        self.rules_file = f"{self.safety_dir}/safety_rules.json"
+        self._rules_lock = threading.Lock()
+        self._failed_rules_stamp = None
+        self.ruleset = self._load_safety_rules()
         
         # Initialize checkers
         self.claim_checker = ClaimChecker()
         self.exaggeration_filter = ExaggerationFilter()
-        self.plagiarism_signal = PlagiarismSignal()
+        self.plagiarism_signal = PlagiarismSignal(f"{self.safety_dir}/near_duplicates.db")
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        # Cached rule checks depend on the checking code as well as the rules
+        self.code_version = code_version(type(self), PhraseMatcher, SafetyRuleSet)
+        
+        # Running totals and the recent window, buffered at check time and flushed in batches
+        self.stats_store = get_store(f"{self.safety_dir}/safety_stats.db")
+        self._init_stats()
+        self._stats_lock = threading.Lock()
+        self._pending_totals = self._empty_totals()
+        self._pending_recent = deque(maxlen=self.RECENT_WINDOW)
+        self._stats_flushed_at = time.time()
+        atexit.register(self.flush_stats)
+    
+    # Number of latest checks behind avg_safety_score and recent_pass_rate
+    RECENT_WINDOW = 10
+    
+    # Buffered check stats are written once this many checks or seconds have piled up
+    STATS_FLUSH_CHECKS = 50
+    STATS_FLUSH_SECONDS = 10.0
+    
+    STATS_INCREMENT = '''
+        INSERT INTO safety_stats (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+    '''
+    
+    def _init_stats(self):
+        with self.stats_store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS safety_stats (
+                    name TEXT PRIMARY KEY,
+                    value REAL DEFAULT 0
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS safety_recent (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    checked_at TEXT,
+                    safety_score REAL,
+                    passed_all INTEGER,
+                    risk_level TEXT
+                )
+            ''')
+            
+            # First run: carry over what the per-check report files recorded until now
+            if conn.execute("SELECT COUNT(*) FROM safety_stats").fetchone()[0] == 0:
+                totals = self._empty_totals()
+                recent = deque(maxlen=self.RECENT_WINDOW)
+                for report in sorted(self._iter_saved_reports(), key=lambda report: report.get('timestamp', '')):
+                    self._tally(totals, recent, report)
+                self._write_stats(conn, totals, recent)
+    
+    def _iter_saved_reports(self):
+        with os.scandir(self.safety_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('safety_report_') and entry.name.endswith('.json'):
+                    try:
+                        with open(entry.path, 'r') as f:
+                            yield json.load(f)
+                    except (OSError, ValueError):
+                        continue
+    
+    @staticmethod
+    def _empty_totals() -> Dict:
+        return {'total_checks': 0, 'passed_checks': 0, 'high_risk_count': 0, 'score_sum': 0.0}
+    
+    @staticmethod
+    def _tally(totals: Dict, recent: deque, result: Dict):
+        """Fold one check result into running totals and the recent window"""
+        score = result.get('safety_score', 1.0)
+        totals['total_checks'] += 1
+        totals['passed_checks'] += bool(result.get('passed_all', False))
+        totals['high_risk_count'] += result.get('risk_level') == 'HIGH'
+        totals['score_sum'] += score
+        recent.append((result.get('timestamp') or datetime.now().isoformat(), score,
+                       int(bool(result.get('passed_all', False))), result.get('risk_level')))
+    
+    def _write_stats(self, conn: sqlite3.Connection, totals: Dict, recent):
+        conn.executemany(self.STATS_INCREMENT, list(totals.items()))
+        conn.executemany(
+            "INSERT INTO safety_recent (checked_at, safety_score, passed_all, risk_level) VALUES (?, ?, ?, ?)",
+            recent
+        )
+        conn.execute(
+            "DELETE FROM safety_recent WHERE seq <= (SELECT MAX(seq) FROM safety_recent) - ?",
+            (self.RECENT_WINDOW,)
+        )
+    
+    def _record_stats(self, totals: Dict, recent, flush: bool = False):
+        """Add to the in-memory buffer; written out when it is big or old enough"""
+        with self._stats_lock:
+            for name, value in totals.items():
+                self._pending_totals[name] += value
+            self._pending_recent.extend(recent)
+            due = (self._pending_totals['total_checks'] >= self.STATS_FLUSH_CHECKS
+                   or time.time() - self._stats_flushed_at >= self.STATS_FLUSH_SECONDS)
+        if flush or due:
+            self.flush_stats()
+    
+    def flush_stats(self):
+        """Write buffered check stats in one transaction"""
+        with self._stats_lock:
+            totals, recent = self._pending_totals, list(self._pending_recent)
+            self._pending_totals = self._empty_totals()
+            self._pending_recent.clear()
+            self._stats_flushed_at = time.time()
+        if not totals['total_checks']:
+            return
+        try:
+            with self.stats_store.transaction() as conn:
+                self._write_stats(conn, totals, recent)
+        except sqlite3.Error:
+            # Put them back for the next flush rather than losing them
+            with self._stats_lock:
+                for name, value in totals.items():
+                    self._pending_totals[name] += value
+                self._pending_recent.extendleft(reversed(recent))
+            raise
+    
+    @property
+    def rules(self) -> MappingProxyType:
+        return self.ruleset.rules
+    
+    def _rules_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.rules_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
     
-    def _load_safety_rules(self) -> Dict:
+    def _load_safety_rules(self) -> 'SafetyRuleSet':
         """Load safety rules from configuration"""
-        rules_file = f"{self.safety_dir}/safety_rules.json"
+        rules_file = self.rules_file
+        # Stamp taken before reading, so an edit landing mid-read triggers another reload
+        stamp = self._rules_stamp()
         
         default_rules = {
             'hallucination_detection': {
                 'enabled': True,
                 'confidence_threshold': 0.8,
-                'check_factual_claims': True
+                'check_factual_claims': True,
+                'factual_indicators': ['studies show', 'research indicates', 'according to', 'proven to'],
+                'citation_markers': ['[1]', '[2]', '[source]', '[citation needed]']
             },
             'exaggerated_claims': {
                 'enabled': True,
@@ -1324,6 +3652,7 @@ class SafetyGuardrail:
                     '100% guaranteed', 'overnight success', 'instant results',
                     'get rich quick', 'secret formula', 'never fail'
                 ],
+                'superlatives': ['best', 'ultimate', 'perfect', 'complete', 'absolute'],
                 'max_superlatives': 3
             },
             'plagiarism': {
@@ -1335,31 +3664,112 @@ class SafetyGuardrail:
                 'enabled': True,
                 'avoid_controversial_topics': True,
                 'ensure_accuracy': True,
-                'add_disclaimers': True
+                'add_disclaimers': True,
+                'disclaimer_keywords': ['disclaimer', 'disclosure', 'affiliate', 'sponsored'],
+                'controversial_topics': ['cryptocurrency scam', 'get rich quick', 'fake news']
             }
         }
         
         if os.path.exists(rules_file):
             with open(rules_file, 'r') as f:
                 user_rules = json.load(f)
-                # Merge with defaults
+                # Merge with defaults (per setting, so older files pick up new lexicons)
                 for key, value in default_rules.items():
                     if key not in user_rules:
                         user_rules[key] = value
-                return user_rules
+                    else:
+                        for setting, default in value.items():
+                            user_rules[key].setdefault(setting, default)
+                return SafetyRuleSet(user_rules, stamp)
+        
+        return SafetyRuleSet(default_rules, stamp)
+    
+    def _rules_changed(self, stamp: Optional[Tuple[int, int]]) -> bool:
+        if stamp == self.ruleset.source_stamp:
+            return False
+        # A file that failed to load is not retried until it changes again
+        return stamp is None or stamp != self._failed_rules_stamp
+    
+    def current_rules(self) -> 'SafetyRuleSet':
+        """Rule set for the next check, reloaded first if safety_rules.json changed"""
+        ruleset = self.ruleset
+        if not self._rules_changed(self._rules_stamp()):
+            return ruleset
+        
+        with self._rules_lock:
+            # Another thread may have reloaded while this one waited
+            stamp = self._rules_stamp()
+            if self._rules_changed(stamp):
+                try:
+                    # A single reference assignment: checks already running keep the old set
+                    self.ruleset = self._load_safety_rules()
+                    print(f"🛡️ Safety rules reloaded (version {self.ruleset.version})")
+                except Exception as e:
+                    # Usually a half-saved file; retried once its mtime/size change again
+                    self._failed_rules_stamp = stamp
+                    print(f"⚠️  Keeping safety rules {self.ruleset.version}: {self.rules_file} failed to load ({e})")
+            return self.ruleset
+    
+    def check_content(self, content: str, title: str = None, doc_id: str = None) -> Dict:
+        """Check content for safety issues
+        
+        The rule-based checks of unchanged content under unchanged rules and
+        checking code come from the result cache. Plagiarism is always re-checked,
+        since the near-duplicate index it compares against keeps growing.
+        """
+        # Taken once, so every sub-check sees the same rules even if a reload lands mid-check
+        ruleset = self.current_rules()
+        
+        key = content_hash(content, title)
+        version = f"{ruleset.version}-{self.code_version}"
+        rule_checks = self.result_cache.get('safety_rules', version, key)
+        result = self._evaluate(content, title, ruleset, doc_id, rule_checks)
+        
+        if rule_checks is None:
+            # Save safety report
+            self._save_safety_report(result)
+            self.result_cache.put('safety_rules', version, key, {
+                name: check for name, check in result['checks'].items() if name in self.RULE_CHECKS
+            })
+        
+        # Every check counts, answered from the cache or not, stamped with when it ran
+        totals = self._empty_totals()
+        recent = []
+        self._tally(totals, recent, dict(result, timestamp=datetime.now().isoformat()))
+        self._record_stats(totals, recent)
         
-        return default_rules
+        return result
+    
+    # Checks whose outcome depends only on the content and the rules (and so can be cached)
+    RULE_CHECKS = ('hallucination_detection', 'exaggerated_claims', 'ethical_compliance', 'content_quality')
     
-    def check_content(self, content: str, title: str = None) -> Dict:
-        """Check content for safety issues"""
+    def _rule_checks(self, content: str, title: str, ruleset: 'SafetyRuleSet') -> Dict:
+        # One pass over the text yields the phrase counts every lexicon check needs
+        hits = ruleset.matcher.scan(content)
         
-        checks = {
-            'hallucination_detection': self._check_hallucination(content),
-            'exaggerated_claims': self._check_exaggeration(content, title),
-            'plagiarism': self._check_plagiarism(content),
-            'ethical_compliance': self._check_ethical_compliance(content),
+        return {
+            'hallucination_detection': self._check_hallucination(content, hits, ruleset),
+            'exaggerated_claims': self._check_exaggeration(content, title, hits, ruleset),
+            'ethical_compliance': self._check_ethical_compliance(content, hits, ruleset),
             'content_quality': self._check_content_quality(content)
         }
+    
+    def _evaluate(self, content: str, title: str, ruleset: 'SafetyRuleSet', doc_id: str = None,
+                  rule_checks: Dict = None) -> Dict:
+        """Run every check against one rule set, without saving anything
+        
+        doc_id is the content's own id in the near-duplicate index, if it has
+        one; rule_checks are previously computed (cached) RULE_CHECKS to reuse.
+        """
+        rule_checks = rule_checks or self._rule_checks(content, title, ruleset)
+        
+        checks = {
+            'hallucination_detection': rule_checks['hallucination_detection'],
+            'exaggerated_claims': rule_checks['exaggerated_claims'],
+            'plagiarism': self._check_plagiarism(content, ruleset, doc_id),
+            'ethical_compliance': rule_checks['ethical_compliance'],
+            'content_quality': rule_checks['content_quality']
+        }
         
         # Calculate overall safety score
         safety_score = self._calculate_safety_score(checks)
@@ -1373,26 +3783,113 @@ class SafetyGuardrail:
             'checks': checks,
             'recommendations': recommendations,
             'passed_all': all(check.get('passed', False) for check in checks.values() if check.get('enabled', True)),
+            'rules_version': ruleset.version,
             'timestamp': datetime.now().isoformat()
         }
         
-        # Save safety report
-        self._save_safety_report(result)
-        
         return result
     
-    def _check_hallucination(self, content: str) -> Dict:
+    DEFAULT_BATCH_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+    
+    def iter_check_batch(self, articles, workers: int = None, chunk_size: int = 32):
+        """Check articles through a process pool, yielding results in input order
+        
+        articles is any iterable of content strings or dicts with 'content' and
+        optional 'title', 'id' and 'doc_id' (the article's id in the near-duplicate
+        index, defaulting to 'id', so indexed articles are not matched against
+        themselves). It is read lazily and at most a few chunks per
+        worker are in flight, so memory stays flat however long the batch is.
+        Every article is checked against the rule set current at the start.
+        Nothing is written to disk.
+        """
+        ruleset = self.current_rules()
+        # Every worker builds its own guardrail (stores, index connection), so stay modest
+        workers = workers or self.DEFAULT_BATCH_WORKERS
+        chunks = _batch_chunks(articles, chunk_size)
+        
+        if workers == 1:
+            for chunk in chunks:
+                yield from (_batch_result(self, ruleset, item) for item in chunk)
+            return
+        
+        window = workers * 2
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_safety_worker, initargs=(ruleset.source,)
+        ) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(executor.submit(_check_safety_chunk, chunk))
+                while len(in_flight) >= window:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+    
+    def check_batch(self, articles, workers: int = None, chunk_size: int = 32,
+                    report_file: str = None, write_report: bool = True) -> Dict:
+        """Check a whole catalogue and return aggregate statistics
+        
+        Results go, in input order, to one JSON-lines report (instead of a
+        safety_report_*.json per article); only running totals stay in memory.
+        """
+        started = time.time()
+        if write_report and not report_file:
+            report_file = f"{self.safety_dir}/batch_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        
+        stats = {
+            'total_checks': 0,
+            'passed': 0,
+            'risk_levels': {'LOW': 0, 'MEDIUM': 0, 'HIGH': 0},
+            'failed_checks': {},
+            'rules_version': None
+        }
+        score_sum = 0.0
+        totals = self._empty_totals()
+        recent = deque(maxlen=self.RECENT_WINDOW)
+        
+        with contextlib.ExitStack() as stack:
+            report = stack.enter_context(open(report_file, 'w', encoding='utf-8')) if write_report else None
+            for result in self.iter_check_batch(articles, workers, chunk_size):
+                stats['total_checks'] += 1
+                stats['passed'] += result['passed_all']
+                stats['risk_levels'][result['risk_level']] += 1
+                stats['rules_version'] = result['rules_version']
+                score_sum += result['safety_score']
+                self._tally(totals, recent, result)
+                for name, check in result['checks'].items():
+                    if check.get('enabled', False) and not check.get('passed', True):
+                        stats['failed_checks'][name] = stats['failed_checks'].get(name, 0) + 1
+                if report:
+                    report.write(json.dumps(result) + '\n')
+        
+        # One stats update for the whole batch
+        self._record_stats(totals, recent, flush=True)
+        
+        total = stats['total_checks']
+        elapsed = time.time() - started
+        stats.update({
+            'avg_safety_score': round(score_sum / total, 3) if total else 1.0,
+            'pass_rate': round(stats['passed'] / total, 3) if total else 1.0,
+            'duration_seconds': round(elapsed, 1),
+            'articles_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+            'report_file': report_file if write_report else None
+        })
+        return stats
+    
+    def _check_hallucination(self, content: str, hits: Dict[str, int] = None,
+                             ruleset: 'SafetyRuleSet' = None) -> Dict:
         """Check for AI hallucinations"""
-        if not self.rules['hallucination_detection']['enabled']:
+        ruleset = ruleset or self.current_rules()
+        if not ruleset.rules['hallucination_detection']['enabled']:
             return {'enabled': False, 'passed': True}
         
+        if hits is None:
+            hits = ruleset.matcher.scan(content)
+        
         # Look for factual claims without evidence markers
-        factual_indicators = ['studies show', 'research indicates', 'according to', 'proven to']
-        contains_factual_claims = any(indicator in content.lower() for indicator in factual_indicators)
+        contains_factual_claims = ruleset.any_of(hits, 'hallucination_detection', 'factual_indicators')
         
         # Look for citation markers
-        citation_markers = ['[1]', '[2]', '[source]', '[citation needed]']
-        has_citations = any(marker in content for marker in citation_markers)
+        has_citations = ruleset.any_of(hits, 'hallucination_detection', 'citation_markers')
         
         passed = not contains_factual_claims or has_citations
         
@@ -1404,23 +3901,23 @@ class SafetyGuardrail:
             'recommendation': 'Add citations for factual claims' if contains_factual_claims and not has_citations else None
         }
     
-    def _check_exaggeration(self, content: str, title: str = None) -> Dict:
+    def _check_exaggeration(self, content: str, title: str = None, hits: Dict[str, int] = None,
+                            ruleset: 'SafetyRuleSet' = None) -> Dict:
         """Check for exaggerated claims"""
-        if not self.rules['exaggerated_claims']['enabled']:
+        ruleset = ruleset or self.current_rules()
+        if not ruleset.rules['exaggerated_claims']['enabled']:
             return {'enabled': False, 'passed': True}
         
-        blacklisted_phrases = self.rules['exaggerated_claims']['blacklisted_phrases']
-        max_superlatives = self.rules['exaggerated_claims']['max_superlatives']
+        if hits is None:
+            hits = ruleset.matcher.scan(content)
+        
+        max_superlatives = ruleset.rules['exaggerated_claims']['max_superlatives']
         
         # Check for blacklisted phrases
-        found_phrases = []
-        for phrase in blacklisted_phrases:
-            if phrase in content.lower():
-                found_phrases.append(phrase)
+        found_phrases = ruleset.found(hits, 'exaggerated_claims', 'blacklisted_phrases')
         
-        # Count superlatives
-        superlatives = ['best', 'ultimate', 'perfect', 'complete', 'absolute']
-        superlative_count = sum(content.lower().count(word) for word in superlatives)
+        # Count superlatives (whole words only, so 'bestseller' is not 'best')
+        superlative_count = ruleset.total(hits, 'exaggerated_claims', 'superlatives')
         
         passed = len(found_phrases) == 0 and superlative_count <= max_superlatives
         
@@ -1433,39 +3930,57 @@ class SafetyGuardrail:
             'recommendation': 'Reduce exaggerated claims and superlatives' if not passed else None
         }
     
-    def _check_plagiarism(self, content: str) -> Dict:
+    def _check_plagiarism(self, content: str, ruleset: 'SafetyRuleSet' = None, doc_id: str = None) -> Dict:
         """Check for potential plagiarism"""
-        if not self.rules['plagiarism']['enabled']:
+        rules = (ruleset or self.current_rules()).rules['plagiarism']
+        if not rules['enabled']:
             return {'enabled': False, 'passed': True}
         
-        # Simple content hash check against memory
         content_hash = hashlib.md5(content.encode()).hexdigest()
+        threshold = rules['similarity_threshold']
         
-        # In a real implementation, this would check against a database
-        # For now, we'll simulate a check
+        # Near-duplicate lookup against everything already indexed (LSH, sub-linear)
+        neighbors = []
+        if rules.get('check_against_memory', True):
+            neighbors = self.plagiarism_signal.query(content, limit=5, exclude=doc_id)
         
-        passed = True  # Assume passed for simulation
+        max_similarity = neighbors[0]['similarity'] if neighbors else 0.0
+        passed = max_similarity < threshold
         
         return {
             'enabled': True,
             'passed': passed,
             'content_hash': content_hash[:12],
-            'similarity_threshold': self.rules['plagiarism']['similarity_threshold'],
-            'recommendation': 'Ensure content is original and properly cited'
+            'similarity_threshold': threshold,
+            'max_similarity': max_similarity,
+            'nearest_neighbors': neighbors,
+            'recommendation': (
+                f"Content is {max_similarity:.0%} similar to {neighbors[0]['doc_id']} - rewrite or cite it"
+                if not passed else 'Ensure content is original and properly cited'
+            )
         }
     
-    def _check_ethical_compliance(self, content: str) -> Dict:
+    def remember_content(self, doc_id: str, content: str, source: str = 'memory'):
+        """Add checked content to the near-duplicate index for future plagiarism checks"""
+        rules = self.current_rules().rules['plagiarism']
+        if rules['enabled'] and rules.get('check_against_memory', True):
+            self.plagiarism_signal.add(doc_id, content, source)
+    
+    def _check_ethical_compliance(self, content: str, hits: Dict[str, int] = None,
+                                  ruleset: 'SafetyRuleSet' = None) -> Dict:
         """Check ethical compliance"""
-        if not self.rules['ethical_guidelines']['enabled']:
+        ruleset = ruleset or self.current_rules()
+        if not ruleset.rules['ethical_guidelines']['enabled']:
             return {'enabled': False, 'passed': True}
         
+        if hits is None:
+            hits = ruleset.matcher.scan(content)
+        
         # Check for disclaimers
-        disclaimer_keywords = ['disclaimer', 'disclosure', 'affiliate', 'sponsored']
-        has_disclaimer = any(keyword in content.lower() for keyword in disclaimer_keywords)
+        has_disclaimer = ruleset.any_of(hits, 'ethical_guidelines', 'disclaimer_keywords')
         
         # Check for controversial content
-        controversial_topics = ['cryptocurrency scam', 'get rich quick', 'fake news']
-        has_controversial = any(topic in content.lower() for topic in controversial_topics)
+        has_controversial = ruleset.any_of(hits, 'ethical_guidelines', 'controversial_topics')
         
         passed = has_disclaimer and not has_controversial
         
@@ -1555,33 +4070,68 @@ class SafetyGuardrail:
             json.dump(report, f, indent=2)
     
     def get_safety_stats(self) -> Dict:
-        """Get safety statistics"""
-        safety_reports = []
-        
-        if os.path.exists(self.safety_dir):
-            for file in os.listdir(self.safety_dir):
-                if file.startswith('safety_report_') and file.endswith('.json'):
-                    filepath = os.path.join(self.safety_dir, file)
-                    with open(filepath, 'r') as f:
-                        try:
-                            report = json.load(f)
-                            safety_reports.append(report)
-                        except:
-                            continue
-        
-        if not safety_reports:
+        """Get safety statistics (two small reads plus the unflushed buffer, never a scan)"""
+        conn = self.stats_store.connection()
+        totals = dict(conn.execute("SELECT name, value FROM safety_stats"))
+        recent = conn.execute(
+            "SELECT checked_at, safety_score, passed_all FROM safety_recent ORDER BY seq DESC LIMIT ?",
+            (self.RECENT_WINDOW,)
+        ).fetchall()[::-1]
+        
+        with self._stats_lock:
+            for name, value in self._pending_totals.items():
+                totals[name] = totals.get(name, 0) + value
+            recent.extend(row[:3] for row in self._pending_recent)
+        recent = recent[-self.RECENT_WINDOW:]
+        
+        total_checks = int(totals.get('total_checks', 0))
+        if not total_checks or not recent:
             return {'total_checks': 0, 'avg_safety_score': 1.0}
         
-        avg_safety_score = statistics.mean(report.get('safety_score', 1.0) for report in safety_reports[-10:])
-        total_passed = sum(1 for report in safety_reports[-10:] if report.get('passed_all', False))
-        
         return {
-            'total_checks': len(safety_reports),
-            'avg_safety_score': round(avg_safety_score, 2),
-            'recent_pass_rate': round(total_passed / min(10, len(safety_reports)), 2),
-            'high_risk_count': sum(1 for report in safety_reports if report.get('risk_level') == 'HIGH')
+            'total_checks': total_checks,
+            'avg_safety_score': round(statistics.mean(row[1] for row in recent), 2),
+            'recent_pass_rate': round(sum(row[2] for row in recent) / len(recent), 2),
+            'high_risk_count': int(totals.get('high_risk_count', 0)),
+            'pass_count': int(totals.get('passed_checks', 0)),
+            'lifetime_avg_safety_score': round(totals.get('score_sum', 0.0) / total_checks, 2),
+            'last_check': recent[-1][0]
         }
 
+# Batch checks run in worker processes, which each build one guardrail and pin
+# the parent's rule set so the whole batch is judged by the same rules
+_safety_worker = None
+
+def _init_safety_worker(rules_source: str):
+    global _safety_worker
+    guardrail = SafetyGuardrail()
+    _safety_worker = (guardrail, SafetyRuleSet(json.loads(rules_source)))
+
+def _check_safety_chunk(chunk: List[Tuple[int, Any]]) -> List[Dict]:
+    guardrail, ruleset = _safety_worker
+    return [_batch_result(guardrail, ruleset, item) for item in chunk]
+
+def _batch_chunks(articles, chunk_size: int):
+    """Lazily cut (index, article) pairs into lists of chunk_size"""
+    numbered = enumerate(articles)
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _batch_result(guardrail: 'SafetyGuardrail', ruleset: 'SafetyRuleSet', item: Tuple[int, Any]) -> Dict:
+    index, article = item
+    if isinstance(article, dict):
+        content, title = article.get('content', ''), article.get('title')
+        article_id = article.get('id', index)
+        doc_id = article.get('doc_id', article.get('id'))
+    else:
+        content, title, article_id, doc_id = article, None, index, None
+    result = guardrail._evaluate(content, title, ruleset, doc_id)
+    result['article_id'] = article_id
+    return result
+
 class ClaimChecker:
     """Check factual claims in content"""
     pass
@@ -1590,9 +4140,340 @@ class ExaggerationFilter:
     """Filter exaggerated claims"""
     pass
 
+class PhraseMatcher:
+    """Word-level Aho-Corasick automaton over a set of phrases
+    
+    Phrases and text are tokenized the same way (lowercased, split on
+    whitespace and on punctuation; punctuation that occurs inside a phrase,
+    such as the brackets of '[1]', is kept as its own token), so a match always
+    starts and ends on a token boundary. The goto/failure graph is flattened
+    into one transition dict per state at build time, which makes a scan a
+    single dict lookup per token however many phrases there are.
+    """
+    
+    def __init__(self, phrases: List[str]):
+        self.phrases = sorted({self.normalize(phrase) for phrase in phrases} - {''})
+        
+        kept = sorted({char for phrase in self.phrases for char in phrase if char in string.punctuation})
+        self._kept_punctuation = [(char, f' {char} ') for char in kept]
+        self._blank_punctuation = str.maketrans({char: ' ' for char in string.punctuation if char not in kept})
+        
+        self._build(self.phrases)
+    
+    @staticmethod
+    def normalize(phrase: str) -> str:
+        """Key a phrase is reported under in scan() results"""
+        return phrase.lower().strip()
+    
+    def tokenize(self, text: str) -> List[str]:
+        text = text.lower().translate(self._blank_punctuation)
+        for char, padded in self._kept_punctuation:
+            if char in text:
+                text = text.replace(char, padded)
+        return text.split()
+    
+    def _build(self, phrases: List[str]):
+        goto = [{}]
+        outputs = [()]
+        for phrase in phrases:
+            state = 0
+            for token in self.tokenize(phrase):
+                if token not in goto[state]:
+                    goto[state][token] = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                state = goto[state][token]
+            outputs[state] += (phrase,)
+        
+        # Breadth-first, so a state's failure target is complete before its children need it
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = dict(goto[0])
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            outputs[state] += outputs[fail[state]]
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for token, child in goto[state].items():
+                fail[child] = transitions[fail[state]].get(token, 0) if state else 0
+                pending.append(child)
+        
+        self._steps = [table.get for table in transitions]
+        self._outputs = outputs
+    
+    def scan(self, text: str) -> Dict[str, int]:
+        """Occurrence count of every phrase found in text (absent phrases are omitted)"""
+        steps, outputs = self._steps, self._outputs
+        matched = []
+        state = 0
+        for token in self.tokenize(text):
+            state = steps[state](token, 0)
+            if outputs[state]:
+                matched.append(state)
+        
+        counts = {}
+        for state in matched:
+            for phrase in outputs[state]:
+                counts[phrase] = counts.get(phrase, 0) + 1
+        return counts
+
+class SafetyRuleSet:
+    """Immutable, compiled snapshot of the safety rules
+    
+    Built once per version of safety_rules.json and only read afterwards:
+    settings are frozen into read-only mappings and tuples, each lexicon into
+    a tuple of normalized phrases, and all lexicons into one PhraseMatcher.
+    SafetyGuardrail replaces the whole object on reload, so a check holding a
+    reference never sees a mix of old and new rules. The version is a digest
+    of the rules themselves, identical across processes and restarts.
+    """
+    
+    # (rule section, lexicon) pairs matched by the phrase automaton
+    LEXICONS = (
+        ('hallucination_detection', 'factual_indicators'),
+        ('hallucination_detection', 'citation_markers'),
+        ('exaggerated_claims', 'blacklisted_phrases'),
+        ('exaggerated_claims', 'superlatives'),
+        ('ethical_guidelines', 'disclaimer_keywords'),
+        ('ethical_guidelines', 'controversial_topics')
+    )
+    
+    def __init__(self, rules: Dict, source_stamp: Tuple[int, int] = None):
+        # Canonical JSON of the merged rules: digested for the version, and what
+        # batch worker processes rebuild the same rule set from
+        self.source = json.dumps(rules, sort_keys=True)
+        self.version = hashlib.sha1(self.source.encode()).hexdigest()[:12]
+        self.source_stamp = source_stamp  # (mtime_ns, size) of the file it was read from
+        self.loaded_at = datetime.now().isoformat()
+        self.rules = self._freeze(rules)
+        
+        self.lexicons = MappingProxyType({
+            (section, lexicon): tuple(dict.fromkeys(
+                PhraseMatcher.normalize(phrase) for phrase in rules[section][lexicon]
+            ))
+            for section, lexicon in self.LEXICONS
+        })
+        self.matcher = PhraseMatcher([phrase for phrases in self.lexicons.values() for phrase in phrases])
+    
+    @classmethod
+    def _freeze(cls, value):
+        if isinstance(value, dict):
+            return MappingProxyType({key: cls._freeze(item) for key, item in value.items()})
+        if isinstance(value, list):
+            return tuple(cls._freeze(item) for item in value)
+        return value
+    
+    def any_of(self, hits: Dict[str, int], section: str, lexicon: str) -> bool:
+        return not hits.keys().isdisjoint(self.lexicons[(section, lexicon)])
+    
+    def found(self, hits: Dict[str, int], section: str, lexicon: str) -> List[str]:
+        return [phrase for phrase in self.lexicons[(section, lexicon)] if phrase in hits]
+    
+    def total(self, hits: Dict[str, int], section: str, lexicon: str) -> int:
+        return sum(hits.get(phrase, 0) for phrase in self.lexicons[(section, lexicon)])
+
 class PlagiarismSignal:
-    """Signal potential plagiarism"""
-    pass
+    """Persistent MinHash + LSH index for near-duplicate detection
+    
+    Each document is reduced to a MinHash signature over word shingles, using
+    one-permutation hashing (one hash per shingle, minimum per bin, empty bins
+    densified from their neighbour) so signing costs O(shingles) rather than
+    O(shingles x num_perm). The signature is cut into bands and every band is
+    hashed into a bucket; two documents become candidates when they share at
+    least one bucket, so a query only touches the rows of its own buckets
+    however large the corpus. Candidates are then ranked by the Jaccard
+    estimate of the full signatures.
+    """
+    
+    def __init__(self, db_path: str = "safety/near_duplicates.db", num_perm: int = 128,
+                 bands: int = 16, shingle_size: int = 5, max_candidates: int = 200):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.db_path = db_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+        
+        # Values live below the offset; each bin skipped when densifying adds one offset,
+        # so borrowed values never collide with real ones and still fit an unsigned 64-bit
+        self._densify_offset = (1 << 63) // num_perm
+        self._band_format = f'<{self.rows}Q'
+        self._signature_format = f'<{num_perm}Q'
+        
+        self.store = get_store(db_path)
+        self._init_database()
+    
+    def _init_database(self):
+        with self.store.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS minhash_docs (
+                    doc_id TEXT PRIMARY KEY,
+                    source TEXT,
+                    signature BLOB,
+                    indexed_at TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS minhash_bands (
+                    band INTEGER,
+                    bucket INTEGER,
+                    doc_id TEXT,
+                    PRIMARY KEY (band, bucket, doc_id)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_minhash_bands_doc ON minhash_bands (doc_id)")
+    
+    def _shingle_hashes(self, text: str) -> set:
+        words = re.findall(r'\w+', text.lower())
+        # Shorter than one shingle: nothing meaningful to compare, so never a match
+        if len(words) < self.shingle_size:
+            return set()
+        k = self.shingle_size
+        shingles = {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        # blake2b rather than hash(): stable across processes, which the persisted index needs
+        return {
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles
+        }
+    
+    def signature(self, text: str) -> Optional[List[int]]:
+        """One-permutation MinHash signature with rotation densification (None for too-short text)"""
+        bins = self.num_perm
+        signature = [None] * bins
+        for value in self._shingle_hashes(text):
+            # Low bits pick the bin, the higher bits are the value ranked within it
+            index, value = value % bins, (value // bins) % self._densify_offset
+            current = signature[index]
+            if current is None or value < current:
+                signature[index] = value
+        
+        if signature.count(None) == bins:
+            return None
+        
+        # Empty bins borrow from the next non-empty bin to the right (circularly)
+        densified = list(signature)
+        for index in range(bins):
+            if signature[index] is None:
+                distance = 1
+                while signature[(index + distance) % bins] is None:
+                    distance += 1
+                densified[index] = signature[(index + distance) % bins] + distance * self._densify_offset
+        return densified
+    
+    def _band_buckets(self, signature: List[int]) -> List[Tuple[int, int]]:
+        buckets = []
+        for band in range(self.bands):
+            packed = struct.pack(self._band_format, *signature[band * self.rows:(band + 1) * self.rows])
+            digest = hashlib.blake2b(packed, digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, 'little', signed=True)))
+        return buckets
+    
+    def add(self, doc_id: str, text: str, source: str = None):
+        """Index (or re-index) one document"""
+        self.add_many([(doc_id, text, source)])
+    
+    def add_many(self, documents) -> int:
+        """Index an iterable of (doc_id, text, source) in one transaction"""
+        docs, bands, unindexable = [], [], []
+        now = datetime.now().isoformat()
+        for doc_id, text, source in documents:
+            signature = self.signature(text or '')
+            if signature is None:
+                unindexable.append((doc_id,))
+                continue
+            docs.append((doc_id, source, struct.pack(self._signature_format, *signature), now))
+            bands.extend((band, bucket, doc_id) for band, bucket in self._band_buckets(signature))
+        
+        if unindexable:
+            # Re-indexed as too short: drop whatever an older version stored for it
+            with self.store.transaction() as conn:
+                conn.executemany("DELETE FROM minhash_bands WHERE doc_id = ?", unindexable)
+                conn.executemany("DELETE FROM minhash_docs WHERE doc_id = ?", unindexable)
+        
+        if docs:
+            with self.store.transaction() as conn:
+                conn.executemany("DELETE FROM minhash_bands WHERE doc_id = ?", [(doc[0],) for doc in docs])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO minhash_docs (doc_id, source, signature, indexed_at) VALUES (?, ?, ?, ?)",
+                    docs
+                )
+                conn.executemany("INSERT OR IGNORE INTO minhash_bands (band, bucket, doc_id) VALUES (?, ?, ?)", bands)
+        return len(docs)
+    
+    def query(self, text: str, limit: int = 5, exclude: str = None) -> List[Dict]:
+        """Nearest indexed documents by estimated Jaccard similarity, best first
+        
+        exclude is the checked document's own doc_id, so content that is already
+        indexed is not reported as a copy of itself.
+        """
+        signature = self.signature(text or '')
+        if signature is None:
+            return []
+        buckets = self._band_buckets(signature)
+        cursor = self.store.connection().cursor()
+        
+        # Candidates sharing the most bands first; bounded so a hot bucket can't blow up the query
+        # (CROSS JOIN keeps the bucket list as the outer loop: one primary-key seek per band)
+        cursor.execute(f'''
+            WITH query (band, bucket) AS (VALUES {','.join(['(?, ?)'] * len(buckets))})
+            SELECT d.doc_id, d.signature
+            FROM (
+                SELECT b.doc_id, COUNT(*) AS shared
+                FROM query CROSS JOIN minhash_bands b ON b.band = query.band AND b.bucket = query.bucket
+                GROUP BY b.doc_id
+                ORDER BY shared DESC
+                LIMIT ?
+            ) c
+            JOIN minhash_docs d ON d.doc_id = c.doc_id
+        ''', [value for bucket in buckets for value in bucket] + [self.max_candidates])
+        
+        neighbors = []
+        for doc_id, packed in cursor.fetchall():
+            if doc_id == exclude:
+                continue
+            other = struct.unpack(self._signature_format, packed)
+            matches = sum(1 for mine, theirs in zip(signature, other) if mine == theirs)
+            neighbors.append({'doc_id': doc_id, 'similarity': round(matches / self.num_perm, 4)})
+        
+        neighbors.sort(key=lambda neighbor: neighbor['similarity'], reverse=True)
+        return neighbors[:limit]
+    
+    def index_articles_pro(self, db_path: str, batch_size: int = 500) -> int:
+        """Index every article of a ProfitMasterSupreme database (articles_pro) not indexed yet"""
+        # get_store would create an empty file for a mistyped path
+        if not os.path.exists(db_path):
+            print(f"⚠️  No articles database at {db_path}: nothing to index")
+            return 0
+        
+        source = get_store(db_path).connection().cursor()
+        try:
+            source.execute("SELECT id, content FROM articles_pro ORDER BY id")
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  {db_path} has no readable articles_pro table ({e}): nothing to index")
+            return 0
+        known = self.store.connection()
+        
+        indexed = 0
+        while True:
+            rows = source.fetchmany(batch_size)
+            if not rows:
+                break
+            doc_ids = [f"articles_pro:{row[0]}" for row in rows]
+            existing = {
+                doc_id for (doc_id,) in known.execute(
+                    f"SELECT doc_id FROM minhash_docs WHERE doc_id IN ({','.join('?' * len(doc_ids))})", doc_ids
+                )
+            }
+            indexed += self.add_many(
+                (doc_id, content, 'articles_pro') for doc_id, (_, content) in zip(doc_ids, rows)
+                if doc_id not in existing
+            )
+        return indexed
+    
+    def count(self) -> int:
+        return self.store.connection().execute("SELECT COUNT(*) FROM minhash_docs").fetchone()[0]
 
 # =================== MULTI-AGENT SHADOW MODE ===================
 
@@ -2070,7 +4951,7 @@ class MonetizationAgent(ShadowAgent):
 class ShadowAgentOrchestrator:
     """Orchestrate multiple shadow agents"""
     
-    def __init__(self, telemetry: TelemetryCollector = None):
+    def __init__(self, telemetry: TelemetryCollector = None, result_cache: ResultCache = None):
         self.telemetry = telemetry
         
         # Initialize agents
@@ -2080,11 +4961,19 @@ class ShadowAgentOrchestrator:
             'monetization': MonetizationAgent('monetization_agent', telemetry)
         }
         
+        # Editing any agent (or this class) changes the version and so invalidates cached results
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        self.version = code_version(type(self), ShadowAgent, *(type(agent) for agent in self.agents.values()))
+        
         self.results_dir = "agents/results"
         os.makedirs(self.results_dir, exist_ok=True)
     
     def evaluate_content(self, content: str, metadata: Dict = None) -> Dict:
         """Evaluate content using all agents"""
+        key = content_hash(content, metadata)
+        cached = self.result_cache.get('shadow_agents', self.version, key)
+        if cached is not None:
+            return cached
         
         # Run agents in parallel
         with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
@@ -2126,6 +5015,7 @@ class ShadowAgentOrchestrator:
         
         # Save evaluation
         self._save_evaluation(consolidated_result)
+        self.result_cache.put('shadow_agents', self.version, key, consolidated_result)
         
         return consolidated_result
     
@@ -2186,12 +5076,19 @@ class EnterpriseOrchestrator:
         print("📊 Loading Add-on Systems...")
         
         # Initialize all add-ons
-        self.telemetry = TelemetryCollector()
-        self.memory = ContentMemory()
+        self.telemetry = TelemetryCollector((original_system_config or {}).get('telemetry'))
+        self.memory = ContentMemory((original_system_config or {}).get('memory'), self.telemetry)
         self.override = HumanOverrideSwitch()
         self.simulator = DryRunSimulator(self.telemetry, self.memory)
-        self.safety = SafetyGuardrail()
-        self.shadow_agents = ShadowAgentOrchestrator(self.telemetry)
+        
+        # Safety and agent results for unchanged content are served from one shared cache
+        self.result_cache = ResultCache((original_system_config or {}).get('result_cache_path', DEFAULT_CACHE_PATH))
+        self.telemetry.register_cache('results', self.result_cache)
+        self.safety = SafetyGuardrail(self.result_cache)
+        self.shadow_agents = ShadowAgentOrchestrator(self.telemetry, self.result_cache)
+        
+        # Opt-in per-stage cProfile/tracemalloc (PROFILE_STAGES=1 or --profile-stages)
+        self.profiler = StageProfiler(os.path.join(os.path.dirname(self.telemetry.db_path), "profiles"))
         
         # Track original system
         self.original_system_config = original_system_config or {}
@@ -2209,47 +5106,52 @@ class EnterpriseOrchestrator:
     def monitor_original_system(self, original_system_function):
         """Monitor original system execution WITHOUT modification"""
         
+        tracer = self.telemetry.tracer
+        
         def wrapper(*args, **kwargs):
-            # Start telemetry
-            self.telemetry.capture_event(
-                "original_system_start",
-                "orchestrator",
-                {"function": original_system_function.__name__}
-            )
-            
-            start_time = time.time()
-            
-            try:
-                # Execute original system
-                result = original_system_function(*args, **kwargs)
-                
-                # Record success
+            # One trace per article: generate -> evaluate -> publish
+            with tracer.span("article_pipeline", function=original_system_function.__name__):
+                # Start telemetry
                 self.telemetry.capture_event(
-                    "original_system_success",
+                    "original_system_start",
                     "orchestrator",
-                    {
-                        "function": original_system_function.__name__,
-                        "execution_time": time.time() - start_time
-                    }
+                    {"function": original_system_function.__name__}
                 )
                 
-                # Process result with add-ons
-                self._process_original_system_result(result)
+                start_time = time.time()
                 
-                return result
-                
-            except Exception as e:
-                # Record error
-                self.telemetry.capture_event(
-                    "original_system_error",
-                    "orchestrator",
-                    {
-                        "function": original_system_function.__name__,
-                        "error": str(e),
-                        "execution_time": time.time() - start_time
-                    }
-                )
-                raise
+                try:
+                    # Execute original system
+                    with tracer.span("generate"), self.profiler.stage("generate"):
+                        result = original_system_function(*args, **kwargs)
+                    
+                    # Record success
+                    self.telemetry.capture_event(
+                        "original_system_success",
+                        "orchestrator",
+                        {
+                            "function": original_system_function.__name__,
+                            "execution_time": time.time() - start_time
+                        }
+                    )
+                    
+                    # Process result with add-ons
+                    self._process_original_system_result(result)
+                    
+                    return result
+                    
+                except Exception as e:
+                    # Record error
+                    self.telemetry.capture_event(
+                        "original_system_error",
+                        "orchestrator",
+                        {
+                            "function": original_system_function.__name__,
+                            "error": str(e),
+                            "execution_time": time.time() - start_time
+                        }
+                    )
+                    raise
         
         return wrapper
     
@@ -2262,30 +5164,45 @@ class EnterpriseOrchestrator:
         if article_data:
             print("\n🔍 Processing through Enterprise Add-ons...")
             
+            tracer = self.telemetry.tracer
+            profiler = self.profiler
+            
             # 1. Store in memory
-            self.memory.store_article(article_data)
+            with tracer.span("memory.store_article"), profiler.stage("memory.store_article"):
+                self.memory.store_article(article_data)
             print("   ✅ Stored in Content Memory")
             
-            # 2. Run safety check
-            safety_result = self.safety.check_content(
-                article_data.get('content', ''),
-                article_data.get('title', '')
+            # 2. Run safety check (excluding the article's own index entry on re-runs)
+            content = article_data.get('content') or ''
+            doc_id = "memory:" + (
+                article_data.get('slug') or article_data.get('hash') or hashlib.md5(content.encode()).hexdigest()[:12]
             )
+            with tracer.span("safety.check_content"), profiler.stage("safety.check_content"):
+                safety_result = self.safety.check_content(content, article_data.get('title', ''), doc_id)
             print(f"   ✅ Safety Check: {safety_result.get('risk_level')}")
             
+            if content:
+                self.safety.remember_content(doc_id, content)
+            
             # 3. Run shadow agents
-            agent_result = self.shadow_agents.evaluate_content(
-                article_data.get('content', ''),
-                article_data
-            )
+            with tracer.span("shadow_agents.evaluate_content"), profiler.stage("shadow_agents.evaluate_content"):
+                agent_result = self.shadow_agents.evaluate_content(
+                    article_data.get('content', ''),
+                    article_data
+                )
             print(f"   ✅ Shadow Agents: {agent_result.get('overall_confidence')} confidence")
             
             # 4. Run simulation
-            simulation_result = self.simulator.simulate_publication(article_data)
+            with tracer.span("simulator.simulate_publication"), profiler.stage("simulator.simulate_publication"):
+                simulation_result = self.simulator.simulate_publication(article_data)
             print(f"   ✅ Dry-Run Simulation: ${simulation_result.get('estimated_monthly_revenue')}/month")
             
             # 5. Generate reports
-            self._generate_system_reports(article_data, safety_result, agent_result, simulation_result)
+            with tracer.span("generate_system_reports"), profiler.stage("generate_system_reports"):
+                self._generate_system_reports(article_data, safety_result, agent_result, simulation_result)
+            
+            # Per-stage profiled-time summary (only when profiling is enabled)
+            profiler.report()
             
             print("\n📊 Enterprise Analysis Complete!")
     
@@ -2300,19 +5217,7 @@ class EnterpriseOrchestrator:
         # Try to extract from file if result is a file path
         if isinstance(result, str) and result.endswith('.html'):
             try:
-                with open(result, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                # Extract title from HTML
-                title_match = re.search(r'<title>(.*?)</title>', content)
-                title = title_match.group(1) if title_match else "Unknown Title"
-                
-                return {
-                    'title': title,
-                    'content': content,
-                    'word_count': len(content.split()),
-                    'hash': hashlib.md5(content.encode()).hexdigest()[:12]
-                }
+                return extract_article_file(result)
             except:
                 pass
         
@@ -2392,7 +5297,8 @@ class EnterpriseOrchestrator:
             'memory': {
                 'stats': self.memory._get_system_stats(),
                 'best_topics': self.memory.get_best_topics(5),
-                'total_articles': self.memory._count_articles()
+                'total_articles': self.memory._count_articles(),
+                'cache': self.memory.get_cache_stats()
             },
             'safety': self.safety.get_safety_stats(),
             'agents': self.shadow_agents.get_agent_performance(),
@@ -2522,6 +5428,97 @@ class EnterpriseOrchestrator:
 
 # =================== USAGE EXAMPLE ===================
 
+def run_telemetry_retention(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --telemetry-retention [--days N] [--full-vacuum]"""
+    days = 14
+    if '--days' in args:
+        days = int(args[args.index('--days') + 1])
+    
+    retention = TelemetryRetention("telemetry/telemetry.db", retention_days=days)
+    
+    if '--full-vacuum' in args:
+        print("🧹 Switching telemetry DB to incremental auto_vacuum (full VACUUM)...")
+        retention.enable_incremental_vacuum()
+    
+    print(f"🧹 Pruning telemetry older than {days} days...")
+    stats = retention.run()
+    
+    print(f"   Downsampled: {stats['downsampled']}")
+    print(f"   Deleted: {stats['deleted']}")
+    print(f"   Pages reclaimed: {stats['vacuumed_pages']}")
+    print(f"✅ Retention complete in {stats['duration_seconds']}s")
+
+def run_telemetry_aggregator(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --telemetry-aggregator [--socket PATH]"""
+    socket_path = "telemetry/aggregator.sock"
+    if '--socket' in args:
+        socket_path = args[args.index('--socket') + 1]
+    
+    TelemetryAggregator(socket_path).serve_forever()
+
+def run_memory_stats_check(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --memory-stats-check [--rebuild]"""
+    result = ContentMemory().check_stats(rebuild='--rebuild' in args)
+    
+    if result['consistent']:
+        print("✅ Memory stats match the tables")
+        return
+    
+    for name, values in result['mismatches'].items():
+        print(f"⚠️  {name}: stored {values['stored']}, actual {values['actual']}")
+    print("✅ Memory stats rebuilt" if result['rebuilt'] else "Run with --rebuild to fix")
+
+def run_memory_backfill(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --backfill-memory [--output DIR] [--backups DIR] [--log FILE] [--workers N]"""
+    options = {'--output': 'output', '--backups': '.', '--log': 'automation_log.json', '--workers': '4'}
+    for flag in options:
+        if flag in args:
+            options[flag] = args[args.index(flag) + 1]
+    
+    backfill = MemoryBackfill(ContentMemory(), workers=int(options['--workers']))
+    stats = backfill.run(options['--output'], options['--backups'], options['--log'])
+    print(f"✅ Backfill complete in {stats['duration_seconds']}s")
+    print(json.dumps(stats, indent=2))
+
+def run_memory_export(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --export-memory [--format summary|jsonl|csv] [--tables a,b] [--gzip]"""
+    format = args[args.index('--format') + 1] if '--format' in args else 'summary'
+    tables = args[args.index('--tables') + 1].split(',') if '--tables' in args else None
+    
+    path = ContentMemory().export_memory_report(format, tables, compress='--gzip' in args)
+    print(f"✅ Memory exported: {path}")
+
+def run_safety_audit(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --safety-audit [--output DIR] [--workers N]"""
+    directory = args[args.index('--output') + 1] if '--output' in args else 'output'
+    workers = int(args[args.index('--workers') + 1]) if '--workers' in args else None
+    
+    def articles():
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(MemoryBackfill.ARTICLE_EXTENSIONS):
+                    article = extract_article_file(entry.path)
+                    # Same memory:<slug> ids the orchestrator indexes published articles under
+                    slug = MemoryBackfill._slugify(article['title']) or article['hash']
+                    yield {'id': entry.name, 'doc_id': f"memory:{slug}",
+                           'title': article['title'], 'content': article['content']}
+    
+    stats = SafetyGuardrail().check_batch(articles(), workers=workers)
+    print(f"✅ Safety audit of {stats['total_checks']} articles complete in {stats['duration_seconds']}s")
+    print(json.dumps(stats, indent=2))
+
+def run_plagiarism_index(args: List[str]):
+    """CLI: python ultimate_maker_v7.py --plagiarism-index [--articles-pro PATH]"""
+    db_path = "data/profit_master.db"
+    if '--articles-pro' in args:
+        db_path = args[args.index('--articles-pro') + 1]
+    
+    signal = SafetyGuardrail().plagiarism_signal
+    started = time.time()
+    indexed = signal.index_articles_pro(db_path)
+    print(f"✅ Indexed {indexed} new articles from {db_path} in {time.time() - started:.1f}s "
+          f"({signal.count()} documents in the near-duplicate index)")
+
 def main():
     """Example usage of the Enterprise Orchestrator"""
     
@@ -2596,4 +5593,19 @@ def main():
     print("   ✓ Enterprise ready - Production-grade monitoring and control")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == '--telemetry-retention':
+        run_telemetry_retention(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--telemetry-aggregator':
+        run_telemetry_aggregator(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--plagiarism-index':
+        run_plagiarism_index(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--memory-stats-check':
+        run_memory_stats_check(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--backfill-memory':
+        run_memory_backfill(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--export-memory':
+        run_memory_export(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--safety-audit':
+        run_safety_audit(sys.argv[2:])
+    else:
+        main()
@@ -9,12 +9,13 @@
 """
 
 import time
-import sqlite3
 import random
 import os
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+from sqlite_store import get_store
+
 # ==========================================
 # ⚙️ CONFIGURATION (The Settings)
 # ==========================================
@@ -44,10 +45,11 @@ class EmpireBrain:
     
     def __init__(self, db_path="empire_memory.db"):
         self.db_path = db_path
+        self.store = get_store(db_path)
         self._init_db()
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self.store.connection()
         c = conn.cursor()
         # Tracks topic performance (Views/Revenue)
         c.execute('''CREATE TABLE IF NOT EXISTS history (
@@ -58,7 +60,6 @@ class EmpireBrain:
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )''')
         conn.commit()
-        conn.close()
 
     def get_strategy(self) -> Dict[str, Any]:
         """
@@ -66,8 +67,7 @@ class EmpireBrain:
         - niche: 'Finance', 'Tech', etc.
         - agent_type: 'SEO', 'Viral', etc.
         """
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.store.connection().cursor()
         
         # Simulate Learning: Get avg score per niche
         c.execute("SELECT niche, avg(success_score) as avg_score FROM history GROUP BY niche")
@@ -78,8 +78,6 @@ class EmpireBrain:
         for niche, score in rows:
             scores[niche] = score
         
-        conn.close()
-        
         # Decide Niche (Weighted Random)
         # If Finance has high score, pick it more often
         weighted_list = []
@@ -180,30 +178,25 @@ class EmpireMonitor:
     
     def __init__(self, db_path="empire_memory.db"):
         self.db_path = db_path
+        self.store = get_store(db_path)
         self.session_start = datetime.now()
     
     def log_result(self, niche: str, url: str, agent: str):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        
         # Simulate success score for learning
         simulated_views = random.randint(500, 5000)
         score = min(simulated_views / 2000.0, 2.0)
         
-        c.execute('''
-            INSERT INTO history (niche, views, success_score)
-            VALUES (?, ?, ?)
-        ''', (niche, simulated_views, score))
-        
-        conn.commit()
-        conn.close()
+        with self.store.transaction() as conn:
+            conn.execute('''
+                INSERT INTO history (niche, views, success_score)
+                VALUES (?, ?, ?)
+            ''', (niche, simulated_views, score))
         
         self._generate_dashboard()
     
     def _generate_dashboard(self):
         """Writes dashboard.html"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.store.connection().cursor()
         
         # Stats
         c.execute("SELECT niche, COUNT(*) as count FROM history GROUP BY niche")